@@ -0,0 +1,162 @@
+# audio_capture.py
+# Always-on microphone capture into a preallocated int16 ring buffer
+
+import json
+import threading
+
+import numpy as np
+
+# Written by test_mic.py: the input device that profiled best on this machine
+DEVICE_CACHE_FILE = "audio_device.json"
+
+def load_device_choice(path=DEVICE_CACHE_FILE):
+    """
+    Cached {"device", "name", "samplerate", ...} from the last profile, or None if there is none.
+    Device indices shift when hardware is plugged in, so the index is checked against the
+    name (and looked up by name if it moved) without opening any stream.
+    """
+    try:
+        with open(path) as f:
+            choice = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    import sounddevice as sd
+
+    devices = sd.query_devices()
+    index = choice.get("device")
+    if index is None or index >= len(devices) or devices[index]['name'] != choice.get("name"):
+        matches = [i for i, d in enumerate(devices) if d['name'] == choice.get("name") and d['max_input_channels'] > 0]
+        if not matches:
+            return None
+        choice["device"] = matches[0]
+    return choice
+
+class RingBuffer:
+    """
+    Fixed-size preallocated int16 ring with a single writer.
+    Samples are addressed by absolute position (total samples written so far),
+    so readers can keep their own cursor and pull any window still in the buffer.
+    """
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=np.int16)
+        self.write_pos = 0
+        self.cond = threading.Condition()
+
+    @property
+    def oldest(self):
+        """Absolute position of the oldest sample still held"""
+        return max(0, self.write_pos - self.capacity)
+
+    def write(self, samples):
+        """Copies samples in (at most two slice assignments, no allocation) and wakes up readers"""
+        n = len(samples)
+        with self.cond:
+            if n > self.capacity:
+                # Only the newest capacity samples survive anyway
+                self.write_pos += n - self.capacity
+                samples = samples[-self.capacity:]
+                n = self.capacity
+            start = self.write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self.buffer[start:start + first] = samples[:first]
+            self.buffer[:n - first] = samples[first:]
+            self.write_pos += n
+            self.cond.notify_all()
+
+    def views(self, start, end):
+        """
+        Views (no copy) of the samples in [start, end): one array, or two when the window wraps.
+        Raises BufferError if part of the window was already overwritten.
+        """
+        if start < self.oldest or end > self.write_pos or start > end:
+            raise BufferError(f"samples [{start}, {end}) not available (buffer holds [{self.oldest}, {self.write_pos}))")
+        s, e = start % self.capacity, end % self.capacity
+        if end - start == 0:
+            return (self.buffer[:0],)
+        if s < e or e == 0:
+            return (self.buffer[s:e or self.capacity],)
+        return (self.buffer[s:], self.buffer[:e])
+
+    def read(self, start, end, out=None):
+        """Window [start, end) as one contiguous array: a view when possible, else copied into out (or a new array)"""
+        parts = self.views(start, end)
+        if len(parts) == 1 and out is None:
+            return parts[0]
+        if out is None:
+            out = np.empty(end - start, dtype=np.int16)
+        out[:len(parts[0])] = parts[0]
+        if len(parts) == 2:
+            out[len(parts[0]):end - start] = parts[1]
+        return out[:end - start]
+
+    def wait(self, pos, timeout=None):
+        """Blocks until samples past pos exist, returns the current write position"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.write_pos > pos, timeout=timeout)
+            return self.write_pos
+
+class AudioCapture:
+    """
+    Long-lived input stream: the PortAudio callback thread writes every int16 block
+    into a RingBuffer, so the device is opened once and nothing is lost between turns.
+    An optional audio_preprocess.FrontEnd cleans each block on the way in.
+    """
+    def __init__(self, sample_rate=16000, channels=1, blocksize=480, buffer_seconds=30, device=None,
+                 frontend=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.device = device
+        self.ring = RingBuffer(int(buffer_seconds * sample_rate))
+        self.frontend = frontend
+        self._processed = np.zeros(blocksize, dtype=np.int16)
+        self.stream = None
+        self.overflows = 0
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            self.overflows += 1
+        # First channel only; for a mono stream this is already contiguous
+        block = indata[:, 0]
+        if self.frontend is not None:
+            if len(block) > len(self._processed):
+                self._processed = np.zeros(len(block), dtype=np.int16)
+            block = self.frontend.process(block, self._processed[:len(block)])
+        self.ring.write(block)
+
+    def start(self):
+        import sounddevice as sd
+
+        if self.stream is None:
+            self.stream = sd.InputStream(samplerate=self.sample_rate, channels=self.channels,
+                                         dtype='int16', blocksize=self.blocksize,
+                                         device=self.device, callback=self._callback)
+            self.stream.start()
+        return self
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    @property
+    def running(self):
+        return self.stream is not None
+
+    def blocks(self, start, timeout=1.0):
+        """
+        Yields (position, view) for every new chunk of samples from position start onwards;
+        if the reader fell behind, it skips ahead to the oldest sample still in the buffer
+        """
+        pos = start
+        while True:
+            end = self.ring.wait(pos, timeout=timeout)
+            if end <= pos:
+                raise TimeoutError("No audio from the input stream")
+            pos = max(pos, self.ring.oldest)
+            for view in self.ring.views(pos, end):
+                yield pos, view
+                pos += len(view)
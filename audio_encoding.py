@@ -0,0 +1,67 @@
+# audio_encoding.py
+# FLAC encoding for recognition uploads: in-process with libsndfile instead of a flac subprocess
+
+import io
+import time
+
+import numpy as np
+
+try:
+    import soundfile  # pip install soundfile (bundles libsndfile)
+except (ImportError, OSError):
+    soundfile = None
+
+def in_process_available():
+    return soundfile is not None
+
+def encode_flac_in_process(samples, sample_rate):
+    """int16 samples -> FLAC bytes, encoded in this process (no fork/exec)"""
+    buffer = io.BytesIO()
+    soundfile.write(buffer, np.asarray(samples, dtype=np.int16), sample_rate, format="FLAC", subtype="PCM_16")
+    return buffer.getvalue()
+
+def encode_flac_subprocess(audio_data):
+    """What SpeechRecognition does: spawns the flac binary for every utterance"""
+    return audio_data.get_flac_data(
+        convert_rate=None if audio_data.sample_rate >= 8000 else 8000,
+        convert_width=2  # audio samples must be 16-bit
+    )
+
+def encode_flac(audio_data):
+    """
+    FLAC payload for an sr.AudioData: in-process when soundfile is installed and the audio
+    is already 16-bit at >= 8 kHz (what listen() produces), else the flac subprocess
+    """
+    if soundfile is not None and audio_data.sample_width == 2 and audio_data.sample_rate >= 8000:
+        samples = np.frombuffer(audio_data.frame_data, dtype=np.int16)
+        return encode_flac_in_process(samples, audio_data.sample_rate)
+    return encode_flac_subprocess(audio_data)
+
+def benchmark(seconds=3.0, repeats=20, sample_rate=16000):
+    """Average encode time (ms) and payload size of both paths on synthetic speech-like audio"""
+    import speech_recognition as sr
+
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = (3000 * np.sin(2 * np.pi * 180 * t) * (1 + np.sin(2 * np.pi * 3 * t))
+               + rng.normal(0, 200, len(t))).astype(np.int16)
+    audio_data = sr.AudioData(samples.tobytes(), sample_rate, 2)
+
+    paths = {"subprocess": lambda: encode_flac_subprocess(audio_data)}
+    if soundfile is not None:
+        paths["in-process"] = lambda: encode_flac_in_process(samples, sample_rate)
+
+    results = {}
+    for name, encode in paths.items():
+        encode()  # warm-up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            payload = encode()
+        results[name] = {"avg_ms": 1000 * (time.perf_counter() - start) / repeats, "bytes": len(payload)}
+    return results
+
+if __name__ == "__main__":
+    for name, result in benchmark().items():
+        print(f"{name:>10}: {result['avg_ms']:.1f} ms per 3 s utterance, {result['bytes']} bytes")
+    if soundfile is None:
+        print("In-process encoding unavailable: pip install soundfile")
@@ -0,0 +1,166 @@
+# audio_preprocess.py
+# Block-wise microphone front-end: DC removal, optional high-pass, energy noise gate and AGC.
+# Runs inside the stream callback, so every buffer is preallocated and all array work
+# is done in place with out= (no NumPy allocation per block).
+
+import math
+import time
+
+import numpy as np
+
+def highpass_taps(cutoff_hz, sample_rate, n_taps=63):
+    """Windowed-sinc high-pass FIR (spectral inversion of a Hamming low-pass)"""
+    n_taps |= 1  # odd length: a centre tap to invert
+    n = np.arange(n_taps) - (n_taps - 1) / 2
+    lowpass = np.sinc(2 * cutoff_hz / sample_rate * n) * np.hamming(n_taps)
+    lowpass /= lowpass.sum()
+    taps = -lowpass
+    taps[(n_taps - 1) // 2] += 1.0
+    return taps.astype(np.float32)
+
+class FrontEnd:
+    """
+    process(block, out) cleans one int16 block:
+    - DC offset: a running mean of the input is subtracted
+    - high-pass (optional): FIR over a history buffer holding the end of the previous block
+    - noise gate: blocks below the tracked noise floor + gate_margin_db are attenuated
+      (the floor follows quiet blocks down at once and rises by noise_rise_db per block)
+    - AGC: gain follows the speech level towards target_db, at most max_gain_db
+    Gain changes are ramped across the block so there are no clicks.
+    """
+    def __init__(self, sample_rate=16000, blocksize=480, highpass_hz=None, highpass_taps_n=63,
+                 target_db=-20.0, max_gain_db=20.0, gate_margin_db=6.0, gate_attenuation_db=20.0,
+                 noise_rise_db=0.1, dc_alpha=0.05, agc_alpha=0.1):
+        self.sample_rate = sample_rate
+        self.capacity = blocksize
+        self.taps = highpass_taps(highpass_hz, sample_rate, highpass_taps_n) if highpass_hz else None
+        self.target_db = target_db
+        self.max_gain_db = max_gain_db
+        self.gate_margin_db = gate_margin_db
+        self.gate_gain = 10 ** (-gate_attenuation_db / 20)
+        self.noise_rise_db = noise_rise_db
+        self.dc_alpha = dc_alpha
+        self.agc_alpha = agc_alpha
+
+        history = len(self.taps) - 1 if self.taps is not None else 0
+        self._history = history
+        self._x = np.zeros(history + blocksize, dtype=np.float32)  # [previous block tail | current block]
+        self._y = np.zeros(blocksize, dtype=np.float32)
+        self._tmp = np.zeros(blocksize, dtype=np.float32)
+        self._ramp = np.linspace(0, 1, blocksize, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self._x[:] = 0
+        self.dc = 0.0
+        self.noise_floor_db = None
+        self.speech_db = self.target_db
+        self.gain = 1.0
+        self.gate_open = False
+
+    def _resize(self, n):
+        """Only when the callback is handed a different block size (PortAudio may do that once)"""
+        history = self._history
+        x = np.zeros(history + n, dtype=np.float32)
+        if history:
+            x[-history:] = self._x[-history:]
+        self._x, self.capacity = x, n
+        self._y = np.zeros(n, dtype=np.float32)
+        self._tmp = np.zeros(n, dtype=np.float32)
+        self._ramp = np.linspace(0, 1, n, dtype=np.float32)
+
+    def process(self, block, out):
+        """Cleans int16 block into int16 out (same length; may be the same array), returns out"""
+        n = len(block)
+        if n != self.capacity:
+            self._resize(n)
+        h = self._history
+        x, y, tmp = self._x, self._y, self._tmp
+
+        # Keep the tail of the previous block for the FIR, then take the new samples in
+        if h:
+            x[:h] = x[n:n + h]
+        current = x[h:]
+        np.copyto(current, block, casting='unsafe')
+
+        # DC removal
+        self.dc += self.dc_alpha * (float(current.mean()) - self.dc)
+        current -= self.dc
+
+        # High-pass: y = sum_k taps[k] * x[n - k], one multiply-add per tap
+        if h:
+            taps = self.taps
+            np.multiply(x[h:h + n], taps[0], out=y)
+            for k in range(1, len(taps)):
+                np.multiply(x[h - k:h - k + n], taps[k], out=tmp)
+                y += tmp
+        else:
+            y[:] = current
+
+        # Energy of the cleaned block
+        level_db = 10 * math.log10(float(np.dot(y, y)) / n / 32768.0 ** 2 + 1e-12)
+
+        # Noise gate: the floor drops straight to quiet blocks and creeps up slowly otherwise
+        if self.noise_floor_db is None or level_db < self.noise_floor_db:
+            self.noise_floor_db = level_db
+        else:
+            self.noise_floor_db += self.noise_rise_db
+        self.gate_open = level_db > self.noise_floor_db + self.gate_margin_db
+
+        # AGC follows the speech level only, so the gain isn't pumped up by silence
+        if self.gate_open:
+            self.speech_db += self.agc_alpha * (level_db - self.speech_db)
+        agc_db = min(self.max_gain_db, max(-self.max_gain_db, self.target_db - self.speech_db))
+        gain = 10 ** (agc_db / 20) * (1.0 if self.gate_open else self.gate_gain)
+
+        # Ramp from the previous gain to the new one over the block
+        np.multiply(self._ramp, gain - self.gain, out=tmp)
+        tmp += self.gain
+        y *= tmp
+        self.gain = gain
+
+        np.clip(y, -32768, 32767, out=y)
+        np.copyto(out, y, casting='unsafe')
+        return out
+
+    def process_array(self, samples):
+        """Whole recording (e.g. the fixed listen mode) in blocks; returns a new int16 array"""
+        out = np.empty(len(samples), dtype=np.int16)
+        for start in range(0, len(samples), self.capacity):
+            self.process(samples[start:start + self.capacity], out[start:start + self.capacity])
+        return out
+
+def make_frontend(settings, sample_rate, blocksize):
+    """FrontEnd from the "audio_preprocess" config section (None when disabled)"""
+    settings = dict(settings)
+    if not settings.pop("enabled", True):
+        return None
+    return FrontEnd(sample_rate, blocksize, **settings)
+
+def benchmark(seconds=10, sample_rate=16000, blocksize=480, highpass_hz=100):
+    """Time per block and memory traced while processing blocks (a few Python scalars, no arrays)"""
+    import tracemalloc
+
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    signal = (3000 * np.sin(2 * np.pi * 220 * t) * (t % 2 < 1) + rng.normal(300, 200, len(t))).astype(np.int16)
+    frontend = FrontEnd(sample_rate, blocksize, highpass_hz=highpass_hz)
+    out = np.empty(blocksize, dtype=np.int16)
+    blocks = [signal[i:i + blocksize] for i in range(0, len(signal) - blocksize + 1, blocksize)]
+
+    frontend.process(blocks[0], out)  # warm up
+    tracemalloc.start()
+    start = time.perf_counter()
+    for block in blocks:
+        frontend.process(block, out)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    block_ms = blocksize / sample_rate * 1000
+    per_block = elapsed / len(blocks) * 1000
+    print(f"{len(blocks)} blocks of {block_ms:.0f} ms: {per_block * 1000:.0f} us per block "
+          f"({per_block / block_ms:.1%} of real time), peak traced memory {peak} bytes")
+
+if __name__ == "__main__":
+    benchmark()
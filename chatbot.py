@@ -2,13 +2,13 @@ import json
 import random
 import re
 import math
-import requests
-import sounddevice as sd
-import numpy as np
-import speech_recognition as sr
-import pyttsx3
-from textblob import TextBlob
+import queue
+import sys
+import time
+_import_started = time.perf_counter()
 from datetime import datetime
+from pipeline import Failed, Pipeline
+from tts import split_sentences, NORMAL, URGENT
 
 # Configuration
 with open("config.json") as f:
@@ -18,16 +18,136 @@ bot_name = config.get("bot_name", "ChatGenie")
 voice_enabled = config.get("voice_enabled", True)
 weather_api_key = config.get("weather_api_key", "")
 
+# Heavy subsystems (audio, speech recognition, TTS, sentiment analysis, HTTP) are set up on
+# first use, so a text-only run never loads the audio or speech stacks. What each one cost
+# is kept in startup_costs: python chatbot.py --startup-report
+startup_costs = {}
+
+def subsystem(name):
+    """Makes the decorated initializer run once, on its first call, and records how long it took"""
+    def wrap(init):
+        def load():
+            if name not in startup_costs:
+                start = time.perf_counter()
+                init()
+                startup_costs[name] = time.perf_counter() - start
+        return load
+    return wrap
+
 # Audio Settings
 SAMPLE_RATE = 16000  # Optimal for speech recognition
 CHANNELS = 1
 DTYPE = 'int16'
-sd.default.device = 1  # Use your working microphone
-
-# Initialize TTS Engine
-engine = pyttsx3.init()
-engine.setProperty('rate', 150)
-engine.setProperty('volume', 1.0)
+RECORD_SECONDS = 5  # "fixed" listen mode
+BLOCK_SIZE = 480  # 30 ms blocks for the streaming capture
+
+# "continuous" keeps one microphone stream open and finds utterances in a ring buffer,
+# "vad" opens a stream per turn and stops when you stop talking, "fixed" records RECORD_SECONDS
+listen_mode = config.get("listen_mode", "continuous")
+listen_timeout = config.get("listen_timeout_s", 8)  # give up if no speech starts in this time
+endpointer = None
+
+# Microphone front-end (DC removal, high-pass, noise gate, AGC), applied block by block as audio arrives
+frontend = None
+
+# Silence trimming before recognition: less audio to upload and to recognize
+trim_settings = config.get("trim_silence", {})
+
+# Wake word: only audio after the bot's name goes to recognition, then follow-ups for a while
+# without it. Needs a few recorded examples first: python wake_word.py enroll
+wake_settings = config.get("wake_word", {})
+wake_detector = None
+follow_up_seconds = wake_settings.get("follow_up_s", 8)
+awake_until = 0.0
+
+# Barge-in ("continuous" listen mode only): the microphone is watched while the bot talks, and
+# user speech over the bot's own echo cancels the rest of the reply and is recognized right away
+barge_in = None
+barge_in_pos = None  # ring position the next utterance starts from after a barge-in
+
+# Continuous capture (started on first use)
+capture = None
+capture_pos = 0  # ring position where the last utterance ended
+capture_buffer_seconds = config.get("capture_buffer_s", 30)
+capture_lookback = config.get("capture_lookback_s", 1.0)  # audio from before a turn started listening
+calibration_seconds = config.get("noise_calibration_s", 0.5)  # ambient noise measured once at start
+
+@subsystem("audio")
+def init_audio():
+    """sounddevice and NumPy, the profiled microphone, VAD, front-end, wake word and barge-in detectors"""
+    global np, sd, Endpointer, trim_silence, AudioCapture, endpointer, frontend, wake_detector, barge_in
+    import numpy as np
+    import sounddevice as sd
+    from vad import Endpointer, BargeInDetector, trim_silence
+    from audio_capture import AudioCapture, load_device_choice
+    from audio_preprocess import make_frontend
+    from wake_word import WakeWordDetector
+
+    if calibration_seconds > capture_buffer_seconds:
+        raise ValueError(f"noise_calibration_s ({calibration_seconds}) must not exceed "
+                         f"capture_buffer_s ({capture_buffer_seconds})")
+
+    device_choice = load_device_choice()  # profiled by test_mic.py
+    if device_choice is not None:
+        sd.default.device = (device_choice["device"], None)  # input only: keep the default output for playback
+    else:
+        print("No profiled microphone, using the system default (run: python test_mic.py)")
+
+    endpointer = Endpointer(SAMPLE_RATE, keep_audio=listen_mode != "continuous", **config.get("vad", {}))
+    frontend = make_frontend(config.get("audio_preprocess", {}), SAMPLE_RATE, BLOCK_SIZE)
+
+    if wake_settings.get("enabled", False):
+        try:
+            wake_detector = WakeWordDetector.from_dir(wake_settings.get("templates_dir", "wake_word"),
+                                                      wake_settings.get("threshold", 0.35))
+        except FileNotFoundError as e:
+            print(f"Wake word disabled: {e}")
+
+    barge_in_settings = dict(config.get("barge_in", {}))
+    if barge_in_settings.pop("enabled", False) and listen_mode == "continuous":
+        barge_in = BargeInDetector(SAMPLE_RATE, **barge_in_settings)
+
+# Speech recognition backends, tried in the configured order
+speech_recognizer = None
+show_recognition_timing = config.get("show_recognition_timing", False)
+
+@subsystem("speech recognition")
+def init_recognition():
+    global sr, speech_recognizer
+    import speech_recognition as sr
+    from recognizers import make_recognizer
+
+    speech_recognizer = make_recognizer(config.get("recognizer", {}))
+
+# TTS worker thread (owns the pyttsx3 engine): speak() queues text and returns immediately.
+# Fixed phrases from RESPONSES are pre-rendered to disk and played from there.
+tts = None
+
+@subsystem("text-to-speech")
+def init_tts():
+    """Starts the TTS worker (the engine itself loads on the worker thread, see tts.startup_seconds)"""
+    global tts
+    from tts import SpeechWorker
+    from tts_cache import SpeechCache
+
+    cache_settings = config.get("tts_cache", {})
+    speech_cache = None
+    if cache_settings.get("enabled", True):
+        speech_cache = SpeechCache(cache_settings.get("dir", "tts_cache"),
+                                   int(cache_settings.get("max_mb", 50) * 1024 * 1024))
+    tts = SpeechWorker(rate=150, volume=1.0, maxsize=config.get("speech_queue_size", 8), cache=speech_cache,
+                       stream=config.get("stream_speech", True)).start()
+    tts.prerender(static_phrases(RESPONSES))
+
+@subsystem("sentiment")
+def init_sentiment():
+    global TextBlob
+    from textblob import TextBlob
+
+@subsystem("http")
+def init_http():
+    global requests
+    import requests
 
 # Mood Tracking
 mood_history = []
@@ -92,369 +212,169 @@ RESPONSES = {
     ]
 }
 
-def speak(text):
-    """Improved text-to-speech with emoji handling"""
-    print(f"{bot_name}: {text}")
-    try:
-        # Remove emojis for speech
-        clean_text = ''.join(char for char in text if ord(char) < 65536)
-        engine.say(clean_text)
-        engine.runAndWait()
-    except Exception as e:
-        print(f"Speech error: {e}")
+def speech_text(text):
+    """Text as it is spoken: emojis removed"""
+    return ''.join(char for char in text if ord(char) < 65536)
+
+def static_phrases(responses):
+    """Every fixed string in RESPONSES, in the sentence chunks the TTS worker speaks"""
+    if isinstance(responses, str):
+        yield from split_sentences(speech_text(responses))
+        return
+    for value in (responses.values() if isinstance(responses, dict) else responses):
+        yield from static_phrases(value)
 
-def listen():
-    """Robust voice recording without temporary files"""
-    recognizer = sr.Recognizer()
+def speak(text, priority=NORMAL, interrupt=False):
+    """Prints the text and queues it for speech; returns the tts.Utterance (None when only printed)"""
+    print(f"{bot_name}: {text}")
+    # A text-only run just prints; once voice mode has been used, replies stay spoken
+    if not voice_enabled and tts is None:
+        return None
+    init_tts()
+    return tts.say(speech_text(text), priority, interrupt)
+
+def record_fixed():
+    """Records a fixed RECORD_SECONDS window"""
+    recording = sd.rec(int(RECORD_SECONDS * SAMPLE_RATE),
+                      samplerate=SAMPLE_RATE,
+                      channels=CHANNELS,
+                      dtype=DTYPE)
+    sd.wait()
+    if frontend is not None:
+        return frontend.process_array(recording[:, 0])
+    return recording.reshape(-1)
+
+def record_utterance():
+    """Streams the microphone until the endpointer detects the end of speech"""
+    endpointer.reset()
+    blocks = queue.Queue()
+
+    def callback(indata, frames, time_info, status):
+        block = indata[:, 0].copy()
+        if frontend is not None:
+            frontend.process(block, block)
+        blocks.put(block)
+
+    deadline = time.monotonic() + listen_timeout
+    with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype=DTYPE,
+                        blocksize=BLOCK_SIZE, callback=callback):
+        while endpointer.process(blocks.get(timeout=1.0)) != Endpointer.DONE:
+            if endpointer.state == Endpointer.IDLE and time.monotonic() > deadline:
+                return np.zeros(0, dtype=np.int16)
+
+    if endpointer.truncated:
+        print("(Maximum recording length reached)")
+    return endpointer.utterance().copy()
+
+def calibrate_noise():
+    """One-off ambient noise calibration from the first moments of capture while the bot is quiet"""
+    global capture_pos
+    if tts is not None:
+        tts.wait(timeout=30)  # the bot's own voice is not background noise
+    start = capture.ring.write_pos
+    end = start + int(calibration_seconds * SAMPLE_RATE)
+    deadline = time.monotonic() + calibration_seconds + 2.0
+    while capture.ring.write_pos < end:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("No audio from the input stream")
+        capture.ring.wait(capture.ring.write_pos, timeout=min(remaining, 1.0))
+    noise_floor = endpointer.calibrate(capture.ring.read(start, end))
+    capture_pos = end
+    print(f"(Calibrated background noise: {noise_floor:.0f} dBFS)")
+
+def start_capture():
+    global capture
+    if capture is None:
+        capture = AudioCapture(SAMPLE_RATE, CHANNELS, BLOCK_SIZE, capture_buffer_seconds,
+                               frontend=frontend).start()
+        try:
+            calibrate_noise()
+        except Exception:
+            # Retried on the next call rather than listening with an uncalibrated endpointer
+            capture.stop()
+            capture = None
+            raise
+
+def record_continuous():
+    """Finds the next utterance in the always-on capture ring buffer"""
+    global capture_pos, barge_in_pos
+    start_capture()
+
+    endpointer.reset()
+    # Look back a little so speech that started just before this call is not lost,
+    # but never re-read the previous utterance
+    ring = capture.ring
+    start = max(capture_pos, ring.write_pos - int(capture_lookback * SAMPLE_RATE), ring.oldest)
+    if barge_in_pos is not None:
+        # Right from where the user cut in, however long the bot took to stop
+        start, barge_in_pos = max(barge_in_pos, ring.oldest), None
+
+    deadline = time.monotonic() + listen_timeout
+    for pos, block in capture.blocks(start):
+        if endpointer.process(block) == Endpointer.DONE:
+            break
+        # With barge-in, hand over to watch_for_barge_in() as soon as the bot starts talking
+        if endpointer.state == Endpointer.IDLE and (time.monotonic() > deadline or
+                                                    (barge_in is not None and tts.speaking.is_set())):
+            capture_pos = pos + len(block)
+            return np.zeros(0, dtype=np.int16)
+
+    if endpointer.truncated:
+        print("(Maximum recording length reached)")
+    capture_pos = start + endpointer.utterance_end
+    # View into the ring when the window doesn't wrap: use it before the buffer comes round again
+    return ring.read(start + endpointer.utterance_start, capture_pos)
+
+def after_wake_word(recording):
+    """The part of the recording after the wake phrase (empty if it wasn't said)"""
+    global awake_until
+    if wake_detector is None or time.monotonic() < awake_until:
+        return recording
+    detected, end, score = wake_detector.find(recording)
+    if not detected:
+        return recording[:0]
+    print(f"(Wake word detected, score {score:.2f})")
+    awake_until = time.monotonic() + follow_up_seconds
+    return recording[end:]
+
+def capture_audio():
+    """Records one utterance with the configured listen mode, returns sr.AudioData (None if no speech)"""
     try:
-        print("\nListening... (Speak now)")
-        recording = sd.rec(int(5 * SAMPLE_RATE),
-                          samplerate=SAMPLE_RATE,
-                          channels=CHANNELS,
-                          dtype=DTYPE)
-        sd.wait()
+        if listen_mode == "continuous":
+            recording = record_continuous()
+        elif listen_mode == "vad":
+            recording = record_utterance()
+        else:
+            recording = record_fixed()
+        recording = after_wake_word(recording)
+        if not len(recording):
+            return None
+        if trim_settings.get("enabled", True):
+            recording = trim_silence(recording, SAMPLE_RATE, endpointer.threshold_db,
+                                     keep_ms=trim_settings.get("keep_ms", 150),
+                                     max_pause_ms=trim_settings.get("max_pause_ms"))
+            if not len(recording):
+                return None
         
-        audio_data = sr.AudioData(
+        return sr.AudioData(
             recording.tobytes(),
             sample_rate=SAMPLE_RATE,
             sample_width=2  # 16-bit = 2 bytes
         )
-        
-        text = recognizer.recognize_google(audio_data, language="en-IN")
-        print(f"You said: {text}")
-        return text.lower()
-        
-    except sr.UnknownValueError:
-        print("Couldn't understand audio")
-        return ""
-    except sr.RequestError as e:
-        print(f"API Error: {e}")
-        return ""
     except Exception as e:
         print(f"Error: {e}")
-        return ""
-
-def calculate_expression(expression):
-    """Handles math calculations"""
-    try:
-        expression = expression.lower().replace('x', '*').replace('×', '*')
-        expression = re.sub(r'what is|what\'s|calculate|compute|how much is', '', expression)
-        
-        if 'square of' in expression:
-            num = re.search(r'square of\s*(\d+)', expression)
-            if num:
-                return f"The result is: {int(num.group(1))**2}"
-        
-        if 'cube of' in expression:
-            num = re.search(r'cube of\s*(\d+)', expression)
-            if num:
-                return f"The result is: {int(num.group(1))**3}"
-        
-        if 'square root of' in expression:
-            num = re.search(r'square root of\s*(\d+)', expression)
-            if num:
-                return f"The result is: {math.sqrt(int(num.group(1)))}"
-        
-        math_expr = re.sub(r'[^0-9+\-*/().^%]', '', expression)
-        if not math_expr:
-            return None
-            
-        result = eval(math_expr, {'__builtins__': None}, {})
-        return f"The result is: {result}"
-    except Exception as e:
-        print(f"Math error: {e}")
-        return None
-
-def get_weather(city_name):
-    """Fetches weather data"""
-    try:
-        if not weather_api_key:
-            return "Weather service not configured. Please set API key."
-            
-        base_url = "http://api.openweathermap.org/data/2.5/weather?"
-        complete_url = f"{base_url}q={city_name}&appid={weather_api_key}&units=metric"
-        
-        response = requests.get(complete_url, timeout=10)
-        data = response.json()
-        
-        if data.get("cod") != 200:
-            return f"Couldn't get weather: {data.get('message', 'Unknown error')}"
-            
-        return {
-            "temperature": data["main"]["temp"],
-            "humidity": data["main"]["humidity"],
-            "description": data["weather"][0]["description"],
-            "city": data["name"]
-        }
-    except Exception as e:
-        print(f"Weather error: {e}")
         return None
 
-def analyze_mood(text):
-    """Advanced sentiment analysis with stress detection"""
-    if not text:
-        return "neutral"
-    
-    analysis = TextBlob(text).sentiment
-    stress_words = ["stress", "overwhelmed", "anxious", "pressure", "tired"]
-    
-    if any(word in text.lower() for word in stress_words):
-        mood = "stress"
-    elif analysis.polarity > 0.3:
-        mood = "positive"
-    elif analysis.polarity < -0.3:
-        mood = "negative"
-    else:
-        mood = "neutral"
-    
-    # Track mood history
-    mood_history.append({
-        "time": datetime.now().strftime("%H:%M"),
-        "mood": mood,
-        "text": text[:50] + ("..." if len(text) > 50 else "")
-    })
-    
-    return mood
-
-def get_mood_suggestion(mood):
-    """Returns personalized wellness suggestion"""
-    if mood == "negative" and len(mood_history) > 0:
-        if TextBlob(mood_history[-1]["text"]).polarity < -0.7:
-            return random.choice(RESPONSES["emergency"])
-    return random.choice(RESPONSES["mood_suggestions"].get(mood, ""))
-
-def get_response(user_input):
-    """Enhanced response handler with all features"""
-    if not user_input:
-        return random.choice(RESPONSES["default"])
-    
-    # Mood analysis
-    mood = analyze_mood(user_input)
-    mood_suggestion = get_mood_suggestion(mood)
-    
-    # Jokes
-    if "joke" in user_input.lower():
-        return f"{random.choice(RESPONSES['jokes'])}\n\n{mood_suggestion}"
-    
-    # Weather queries
-    weather_match = re.search(r'weather (?:in|for|at)?\s*([a-zA-Z\s]+)', user_input.lower())
-    if weather_match:
-        city = weather_match.group(1).strip()
-        weather = get_weather(city)
-        if isinstance(weather, str):  # Error message
-            return f"{weather}\n\n{mood_suggestion}"
-        elif weather:
-            return f"""🌤️ Weather in {weather['city']}:
-{weather['description'].capitalize()}
-🌡️ Temp: {weather['temperature']}°C
-💧 Humidity: {weather['humidity']}%
-
-{mood_suggestion}"""
-        return f"Sorry, couldn't fetch weather data.\n\n{mood_suggestion}"
-    
-    # Math calculations
-    math_result = calculate_expression(user_input)
-    if math_result:
-        return f"{math_result}\n\n{mood_suggestion}"
-    
-    # Mood check
-    if "how are you" in user_input.lower() or "feeling" in user_input.lower():
-        if mood_history:
-            last_mood = mood_history[-1]["mood"]
-            return f"I sense you've been feeling {last_mood} recently. {mood_suggestion}"
-        return "I'm here to listen. How are you really feeling today?"
-    
-    # Command responses
-    user_input_lower = user_input.lower()
-    if any(word in user_input_lower for word in ["hi", "hello", "hey"]):
-        return f"{random.choice(RESPONSES['greeting'])}\n\n{mood_suggestion}"
-    elif any(word in user_input_lower for word in ["what can you do", "help"]):
-        return f"{random.choice(RESPONSES['capabilities'])}\n\n{mood_suggestion}"
-    elif any(word in user_input_lower for word in ["who made you", "creator"]):
-        return f"{random.choice(RESPONSES['creator'])}\n\n{mood_suggestion}"
-    elif any(word in user_input_lower for word in ["bye", "exit", "quit"]):
-        return f"{random.choice(RESPONSES['goodbye'])}\n\n{mood_suggestion}"
-    elif any(word in user_input_lower for word in ["math help"]):
-        return f"{random.choice(RESPONSES['math_help'])}\n\n{mood_suggestion}"
-    elif any(word in user_input_lower for word in ["weather help"]):
-        return f"{random.choice(RESPONSES['weather_help'])}\n\n{mood_suggestion}"
-    
-    # Default
-    return f"{random.choice(RESPONSES['default'])}\n\n{mood_suggestion}"
-
-def main():
-    global voice_enabled
-    
-    speak(random.choice(RESPONSES["greeting"]))
-    print("\nVOICE COMMANDS:")
-    print("- Say 'text mode' to switch to keyboard")
-    print("- Say 'help' for features overview")
-    print("- Say 'exit' to quit")
-    
-    while True:
-        if voice_enabled:
-            print("\nListening... (say 'text mode' or press Ctrl+C)")
-            user_input = listen()
-            
-            if user_input and "text mode" in user_input:
-                voice_enabled = False
-                print("\nTEXT MODE: Type 'voice mode' to switch back")
-                continue
-        else:
-            user_input = input("\nYou: ").strip().lower()
-            if user_input == "voice mode":
-                voice_enabled = True
-                print("\nVOICE MODE: Say 'text mode' to switch back")
-                continue
-        
-        if not user_input:
-            continue
-            
-        if "exit" in user_input or "quit" in user_input:
-            # Show mood history before exiting
-            if mood_history:
-                print("\n📊 Your Mood History:")
-                for entry in mood_history[-3:]:  # Show last 3 entries
-                    print(f"{entry['time']}: {entry['mood'].upper()} - {entry['text']}")
-            speak(random.choice(RESPONSES["goodbye"]))
-            break
-            
-        response = get_response(user_input)
-        speak(response)
-
-if __name__ == "__main__":
-    try:
-        main()
-    except KeyboardInterrupt:
-        speak("Goodbye! Remember to check in with your feelings. 💙")
-    import pyttsx3
-engine = pyttsx3.init()
-engine.say("Test")
-engine.runAndWait()
-engine.stop() 
-import random
-import re
-import math
-import requests
-import sounddevice as sd
-import numpy as np
-import speech_recognition as sr
-import pyttsx3
-from textblob import TextBlob
-from datetime import datetime
-
-# Configuration
-with open("config.json") as f:
-    config = json.load(f)
-
-bot_name = config.get("bot_name", "ChatGenie")
-voice_enabled = config.get("voice_enabled", True)
-weather_api_key = config.get("weather_api_key", "")
-
-# Audio Settings
-SAMPLE_RATE = 16000  # Optimal for speech recognition
-CHANNELS = 1
-DTYPE = 'int16'
-sd.default.device = 1  # Use your working microphone
-
-# Initialize TTS Engine
-engine = pyttsx3.init()
-engine.setProperty('rate', 150)
-engine.setProperty('volume', 1.0)
-
-# Mood Tracking
-mood_history = []
-
-# Enhanced Responses
-RESPONSES = {
-    "greeting": [
-        f"Hello! I'm {bot_name}, your personal assistant! 👋",
-        f"Hi there! I'm {bot_name}, ready to help! 💬"
-    ],
-    "capabilities": [
-        "I can: Check weather, do math, tell jokes, and chat! 🌦️➕😂",
-        "Features: Weather, calculations, mood analysis, humor"
-    ],
-    "creator": [
-        "I was created by a talented developer using Python 🐍",
-        "A programmer built me to be your helpful assistant 💻"
-    ],
-    "goodbye": [
-        "Goodbye! Have a wonderful day! 🌟",
-        "See you later! Come back anytime! 👋"
-    ],
-    "math_help": [
-        "Math examples: '2+2', '5*3', 'sqrt(16)', '2^3' ➗",
-        "Try: '10 plus 5', 'square root of 25', '3 cubed'"
-    ],
-    "weather_help": [
-        "Ask: 'weather in London' or 'what's the weather in Paris?' 🌤️",
-        "Try: 'weather Tokyo' or 'how's the weather in New York?'"
-    ],
-    "jokes": [
-        "Why don't scientists trust atoms? Because they make up everything! 🤓",
-        "I'm reading a book about anti-gravity. It's impossible to put down! 📚",
-        "Why did the scarecrow win an award? Because he was outstanding in his field! 🌾"
-    ],
-    "mood_suggestions": {
-        "positive": [
-            "You're radiating positivity! Maybe spread some joy today! 🌈",
-            "Your good mood is contagious! Consider sharing it with someone! 💌"
-        ],
-        "neutral": [
-            "Everything seems balanced. A short walk might be nice! 🚶‍♂️",
-            "Feeling centered? Try some mindful breathing. 🌿"
-        ],
-        "negative": [
-            "I sense you're feeling down. A 5-minute meditation might help. 🧘‍♀️",
-            "When I feel low, I remember: this too shall pass. 💛"
-        ],
-        "stress": [
-            "Stressful day? Try box breathing: Inhale 4s, Hold 4s, Exhale 4s. 🌬️",
-            "Emergency hack: Name 5 things you can see around you. 👀"
-        ]
-    },
-    "emergency": [
-        "If you need help, please contact: 1-800-XXX-XXXX 🆘",
-        "You're not alone. Reach out to a trusted friend or counselor. 🤝"
-    ],
-    "default": [
-        "I'm not sure I understand. Could you rephrase? 🤔",
-        "Let's try a different question? 💭",
-        "I'm still learning. Ask me something else? 📚"
-    ]
-}
-
-def speak(text):
-    """Improved text-to-speech with emoji handling"""
-    print(f"{bot_name}: {text}")
-    try:
-        # Remove emojis for speech
-        clean_text = ''.join(char for char in text if ord(char) < 65536)
-        engine.say(clean_text)
-        engine.runAndWait()
-    except Exception as e:
-        print(f"Speech error: {e}")
-
-def listen():
-    """Robust voice recording without temporary files"""
-    recognizer = sr.Recognizer()
+def recognize(audio_data):
+    """Speech to text for one captured utterance ("" if it couldn't be understood)"""
     try:
-        print("\nListening... (Speak now)")
-        recording = sd.rec(int(5 * SAMPLE_RATE),
-                          samplerate=SAMPLE_RATE,
-                          channels=CHANNELS,
-                          dtype=DTYPE)
-        sd.wait()
-        
-        audio_data = sr.AudioData(
-            recording.tobytes(),
-            sample_rate=SAMPLE_RATE,
-            sample_width=2  # 16-bit = 2 bytes
-        )
-        
-        text = recognizer.recognize_google(audio_data, language="en-IN")
+        text = speech_recognizer.recognize(audio_data)
         print(f"You said: {text}")
+        if show_recognition_timing:
+            timing = speech_recognizer.last_timing
+            phases = ", ".join(f"{k} {timing[k] * 1000:.0f} ms" for k in ("encode", "upload", "wait", "total") if k in timing)
+            print(f"({phases}; {timing['audio_s']:.1f} s of audio, {timing.get('bytes', 0)} bytes sent)")
         return text.lower()
         
     except sr.UnknownValueError:
@@ -507,6 +427,7 @@ def get_weather(city_name):
         base_url = "http://api.openweathermap.org/data/2.5/weather?"
         complete_url = f"{base_url}q={city_name}&appid={weather_api_key}&units=metric"
         
+        init_http()
         response = requests.get(complete_url, timeout=10)
         data = response.json()
         
@@ -528,6 +449,7 @@ def analyze_mood(text):
     if not text:
         return "neutral"
     
+    init_sentiment()
     analysis = TextBlob(text).sentiment
     stress_words = ["stress", "overwhelmed", "anxious", "pressure", "tired"]
     
@@ -615,28 +537,159 @@ def get_response(user_input):
     # Default
     return f"{random.choice(RESPONSES['default'])}\n\n{mood_suggestion}"
 
+# Voice pipeline: capture -> recognize -> respond run on their own threads with bounded
+# queues, so recognizing turn N doesn't hold up capturing turn N+1. Speech is queued to the
+# TTS worker; utterances recorded while the bot was talking are dropped (it would hear itself).
+voice_pipeline = None
+
+def is_command(user_input):
+    return "text mode" in user_input or "exit" in user_input or "quit" in user_input
+
+def watch_for_barge_in():
+    """
+    While the bot talks: feeds new microphone audio to the barge-in detector and cancels the
+    speech when the user talks over it. Returns True on a barge-in, once the bot has gone quiet
+    (cached audio stops within 20 ms, the live engine at the next word).
+    """
+    global capture_pos, barge_in_pos
+    start_capture()
+    barge_in.reset(endpointer.threshold_db)
+    start = capture.ring.write_pos
+    for pos, block in capture.blocks(start):
+        if not tts.speaking.is_set():
+            capture_pos = pos
+            return False
+        if barge_in.process(block):
+            detected_at = time.perf_counter()
+            tts.cancel()
+            while tts.speaking.is_set() and time.perf_counter() - detected_at < 2.0:
+                time.sleep(0.005)
+            if voice_pipeline is not None:
+                voice_pipeline.record("barge-in", time.perf_counter() - detected_at)
+            barge_in_pos = start + barge_in.onset - int(endpointer.pre_roll_frames * endpointer.frame_len)
+            print("(Interrupted)")
+            return True
+
+def capture_turn():
+    """Pipeline source: one utterance, or None while the bot is talking (unless interrupted)"""
+    if tts.speaking.is_set():
+        if barge_in is None:
+            time.sleep(0.05)
+            return None
+        try:
+            if not watch_for_barge_in():
+                return None
+        except Exception as e:
+            print(f"Error: {e}")
+            return None
+    started = time.monotonic()
+    audio_data = capture_audio()
+    if audio_data is None or tts.speaking.is_set() or tts.last_spoke_at > started:
+        return None
+    return audio_data
+
+def recognize_turn(audio_data):
+    return recognize(audio_data) or None
+
+def respond_turn(user_input):
+    """Commands are handled by the main loop; everything else gets its response computed here"""
+    if is_command(user_input):
+        return user_input, None
+    return user_input, get_response(user_input)
+
+def start_voice_pipeline():
+    init_audio()
+    if listen_mode == "continuous":
+        # Calibrate on ambient noise now, before the bot says anything
+        try:
+            start_capture()
+        except Exception as e:
+            print(f"Error: {e}")
+    init_recognition()
+    init_tts()
+    pipeline = Pipeline(maxsize=config.get("pipeline_queue_size", 2))
+    pipeline.add_source("capture", capture_turn)
+    pipeline.add_stage("recognize", recognize_turn)
+    pipeline.add_stage("respond", respond_turn)
+    return pipeline.start()
+
+def print_startup_report():
+    print("\n⏱️ Startup costs:")
+    for name, seconds in startup_costs.items():
+        print(f"{name:>20}: {seconds * 1000:.0f} ms")
+    if tts is not None and tts.startup_seconds is not None:
+        print(f"{'speech engine':>20}: {tts.startup_seconds * 1000:.0f} ms (on the TTS thread)")
+    print(f"{'not loaded':>20}: {', '.join(n for n in SUBSYSTEMS if n not in startup_costs) or '-'}")
+
+def print_pipeline_stats():
+    print_startup_report()
+    if tts is None:
+        return
+    speech = tts.stats()
+    print("\n⏱️ Speech stats:")
+    for phase in ("first_audio", "wait", "speak"):
+        stats = speech[phase]
+        print(f"{phase:>11}: {stats['processed']} done, avg {stats['avg_ms']:.0f} ms, max {stats['max_ms']:.0f} ms")
+    print(f"{'queue':>11}: {speech['queued']} waiting, {speech['dropped']} dropped, {speech['cancelled']} cancelled")
+    if speech["cache"] is not None:
+        cache = speech["cache"]
+        print(f"{'cache':>11}: {cache['hits']} hits, {cache['misses']} misses, {cache['renders']} rendered, "
+              f"{cache['files']} files ({cache['bytes'] / 1e6:.1f} MB)")
+    if voice_pipeline is None:
+        return
+    print("\n⏱️ Pipeline stats:")
+    for name, stats in voice_pipeline.stats().items():
+        print(f"{name:>9}: queued {stats['depth']}, {stats['processed']} done, {stats['failed']} failed, "
+              f"avg {stats['avg_ms']:.0f} ms, max {stats['max_ms']:.0f} ms")
+    for name, stats in speech_recognizer.stats().items():
+        print(f"{name:>9}: {stats['processed']} done, {stats['failures']} failed, "
+              f"avg {stats['avg_ms']:.0f} ms, max {stats['max_ms']:.0f} ms")
+    for phase, stats in speech_recognizer.phase_stats().items():
+        print(f"{phase:>9}: avg {stats['avg_ms']:.0f} ms, max {stats['max_ms']:.0f} ms")
+    print(f"{'audio':>9}: {speech_recognizer.audio_seconds:.1f} s recognized, "
+          f"{speech_recognizer.bytes_sent} bytes sent")
+
 def main():
-    global voice_enabled
+    global voice_enabled, voice_pipeline
     
+    if voice_enabled:
+        voice_pipeline = start_voice_pipeline()  # starts listening before the greeting plays
     speak(random.choice(RESPONSES["greeting"]))
     print("\nVOICE COMMANDS:")
     print("- Say 'text mode' to switch to keyboard")
     print("- Say 'help' for features overview")
     print("- Say 'exit' to quit")
     
+    announce_listening = True
     while True:
+        response = None
         if voice_enabled:
-            print("\nListening... (say 'text mode' or press Ctrl+C)")
-            user_input = listen()
+            if voice_pipeline is None:
+                voice_pipeline = start_voice_pipeline()
+            if announce_listening:
+                print("\nListening... (say 'text mode' or press Ctrl+C)")
+                announce_listening = False
+            try:
+                result = voice_pipeline.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            announce_listening = True
+            if isinstance(result, Failed):
+                continue  # already reported by the pipeline
+            user_input, response = result
             
             if user_input and "text mode" in user_input:
                 voice_enabled = False
+                # Stop listening and drop turns still being captured or recognized
+                voice_pipeline.pause()
                 print("\nTEXT MODE: Type 'voice mode' to switch back")
                 continue
         else:
             user_input = input("\nYou: ").strip().lower()
             if user_input == "voice mode":
                 voice_enabled = True
+                if voice_pipeline is not None:
+                    voice_pipeline.resume()
                 print("\nVOICE MODE: Say 'text mode' to switch back")
                 continue
         
@@ -649,16 +702,44 @@ def main():
                 print("\n📊 Your Mood History:")
                 for entry in mood_history[-3:]:  # Show last 3 entries
                     print(f"{entry['time']}: {entry['mood'].upper()} - {entry['text']}")
+            print_pipeline_stats()
             speak(random.choice(RESPONSES["goodbye"]))
             break
             
-        response = get_response(user_input)
+        if response is None:
+            response = get_response(user_input)
         speak(response)
 
+startup_costs["chatbot import"] = time.perf_counter() - _import_started
+SUBSYSTEMS = {"audio": init_audio, "speech recognition": init_recognition, "text-to-speech": init_tts,
+              "sentiment": init_sentiment, "http": init_http}
+
+if __name__ == "__main__" and "--startup-report" in sys.argv:
+    # Load everything once to see what each part costs, then exit
+    for init in SUBSYSTEMS.values():
+        try:
+            init()
+        except Exception as e:
+            print(f"Failed to load: {e}")
+    if tts is not None:
+        tts.ready.wait(timeout=10)
+    print_startup_report()
+    if tts is not None:
+        tts.stop(timeout=1)
+    sys.exit()
+
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
-        speak("Goodbye! Remember to check in with your feelings. 💙")
+        speak("Goodbye! Remember to check in with your feelings. 💙", URGENT, interrupt=True)
     finally:
-        engine.stop()
\ No newline at end of file
+        if voice_pipeline is not None:
+            voice_pipeline.stop()
+        if capture is not None:
+            capture.stop()
+        if speech_recognizer is not None:
+            speech_recognizer.close()
+        if tts is not None:
+            tts.wait(timeout=10)  # let the goodbye finish
+            tts.stop(timeout=1)
@@ -0,0 +1,89 @@
+# classifier.py
+# Reusable intent classification: loads the model once, predicts one sentence or a whole batch
+
+import os
+
+import numpy as np
+
+from nltk_utils import LEGACY_TOKENIZER, bag_of_words_batch, make_featurizer, tokenize, warm_stem_cache
+from numpy_model import NUMPY_FILE, load_numpy, make_numpy_model, softmax
+
+def default_model_file():
+    """CHATBOT_MODEL_FILE if set, else the exported NumPy archive, else the torch checkpoint"""
+    return os.environ.get("CHATBOT_MODEL_FILE") or (NUMPY_FILE if os.path.exists(NUMPY_FILE) else "data.pth")
+
+class IntentClassifier:
+    """
+    Loads data.pth / data.npz once and classifies sentences.
+    .npz archives run on NumPy only; torch is imported only for .pth checkpoints.
+    """
+    def __init__(self, file=None, top_k=3):
+        self.file = file or default_model_file()
+        self.top_k = top_k
+        self.use_numpy = self.file.endswith(".npz")
+
+        if self.use_numpy:
+            data = load_numpy(self.file)
+            self.model = make_numpy_model(data)
+        else:
+            import torch
+            from model import NeuralNet
+            data = torch.load(self.file)
+            self.model = NeuralNet(data["input_size"], data["hidden_size"], data["output_size"])
+            self.model.load_state_dict(data["model_state"])
+            self.model.eval()
+
+        self.tags = data["tags"]
+        self.all_words = data["all_words"]
+
+        # Tokenize the same way the model was trained (older checkpoints: nltk); kept per
+        # instance so classifiers from different checkpoints don't change each other's
+        self.tokenizer = data.get("tokenizer", LEGACY_TOKENIZER)
+
+        # Build the featurizer once (word -> index map, or hashed buckets) instead of scanning all_words every turn
+        self.featurizer = make_featurizer(data.get("featurizer", {"type": "vocab"}), self.all_words)
+        # Stem the words users are likely to type (the training patterns) up front; older checkpoints don't list them
+        warm_stem_cache(data.get("pattern_words", ()))
+
+    def _logits(self, X):
+        """Dense (batch, input_size) bag of words -> (batch, output_size) logits as a NumPy array"""
+        if self.use_numpy:
+            return self.model(X)
+        import torch
+        with torch.no_grad():
+            return self.model(torch.from_numpy(X)).numpy()
+
+    def _logits_sparse(self, indices):
+        if self.use_numpy:
+            return self.model.forward_sparse(indices)
+        import torch
+        with torch.no_grad():
+            return self.model.forward_sparse(torch.from_numpy(indices)).numpy()
+
+    def _results(self, probs, top_k):
+        """Turns a (batch, n_tags) probability matrix into one result dict per row"""
+        top_k = min(top_k or self.top_k, len(self.tags))
+        # argpartition + sort of only the k best columns, for every row at once
+        best = np.argpartition(-probs, top_k - 1, axis=1)[:, :top_k]
+        order = np.argsort(-np.take_along_axis(probs, best, axis=1), axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+
+        results = []
+        for row, idx in zip(probs, best):
+            ranked = [(self.tags[i], float(row[i])) for i in idx]
+            results.append({"tag": ranked[0][0], "probability": ranked[0][1], "top_k": ranked})
+        return results
+
+    def predict(self, sentence, top_k=None):
+        """Returns {"tag", "probability", "top_k": [(tag, probability), ...]} for one sentence"""
+        X = self.featurizer.bag_of_words(tokenize(sentence, self.tokenizer), sparse=True)
+        probs = softmax(self._logits_sparse(X))
+        return self._results(probs, top_k)[0]
+
+    def predict_batch(self, sentences, top_k=None):
+        """Same as predict() for a list of sentences, featurized together and run as one matrix multiply"""
+        if not sentences:
+            return []
+        X = bag_of_words_batch([tokenize(s, self.tokenizer) for s in sentences], self.featurizer)
+        probs = softmax(self._logits(X))
+        return self._results(probs, top_k)
@@ -12,6 +12,17 @@ class NeuralNet(nn.Module):
 
     def forward(self, x):
         out = self.l1(x)
+        return self._hidden(out)
+
+    def forward_sparse(self, indices):
+        """
+        forward pass for a sparse bag of words (indices of the 1 entries),
+        the first layer is just a sum of weight columns so no dense input is built
+        """
+        out = self.l1.weight.index_select(1, indices).sum(dim=1) + self.l1.bias
+        return self._hidden(out.unsqueeze(0))
+
+    def _hidden(self, out):
         out = torch.relu(out)
         out = self.l2(out)
         out = torch.relu(out)
@@ -1,25 +1,258 @@
 # nltk_utils.py
 
+import os
+import re
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
 import numpy as np
 import nltk
 from nltk.stem.porter import PorterStemmer
 
 stemmer = PorterStemmer()
 
-def tokenize(sentence):
-    return nltk.word_tokenize(sentence)
+# Tokenizer used by tokenize(): "regex" (built-in, needs no NLTK data) or "nltk" (punkt)
+TOKENIZERS = ("regex", "nltk")
+TOKENIZER = os.environ.get("CHATBOT_TOKENIZER", "regex")
+# What checkpoints saved before the tokenizer was recorded in them were trained with
+LEGACY_TOKENIZER = "nltk"
+
+# Mirrors nltk.word_tokenize on short chat patterns: contractions ("don't" -> "do", "n't",
+# "that's" -> "that", "'s"), numbers, hyphenated words and single punctuation marks
+_TOKEN_RE = re.compile(r"""
+      \w+(?=n't\b)                # "do" of "don't"
+    | n't\b                        # "n't" of "don't"
+    | '(?:s|re|ve|ll|d|m)\b        # clitics: 's 're 've 'll 'd 'm
+    | \d+(?:[.,]\d+)+              # 3.14, 1,000
+    | \w+(?:-\w+)*                 # words, well-known
+    | \.\.\.                        # ellipsis
+    | [^\w\s]                       # any other single symbol
+""", re.VERBOSE | re.IGNORECASE)
+
+# Featurizer used for training: "vocab" (one input per word of all_words) or
+# "hashed" (stems, and optionally word bigrams, hashed into a fixed number of buckets)
+FEATURIZERS = ("vocab", "hashed")
+FEATURIZER = os.environ.get("CHATBOT_FEATURIZER", "vocab")
+HASH_BUCKETS = int(os.environ.get("CHATBOT_HASH_BUCKETS", "1024"))
+HASH_BIGRAMS = os.environ.get("CHATBOT_HASH_BIGRAMS", "0") == "1"
+
+IGNORE_WORDS = ['?', '!', '.', ',']
+
+# Bounded LRU cache for stems: the same few words are stemmed on every turn
+STEM_CACHE_SIZE = 4096
+
+def tokenize(sentence, tokenizer=None):
+    tokenizer = tokenizer or TOKENIZER
+    if tokenizer == "regex":
+        return _TOKEN_RE.findall(sentence)
+    if tokenizer == "nltk":
+        return nltk.word_tokenize(sentence)
+    raise ValueError(f"Unknown tokenizer: {tokenizer} (expected one of {TOKENIZERS})")
+
+def set_tokenizer(tokenizer):
+    """select the tokenizer used by tokenize() for the rest of the process"""
+    global TOKENIZER
+    if tokenizer not in TOKENIZERS:
+        raise ValueError(f"Unknown tokenizer: {tokenizer} (expected one of {TOKENIZERS})")
+    TOKENIZER = tokenizer
+
+def featurizer_settings():
+    """settings that change the features produced from a sentence (used as a cache key)"""
+    settings = {"tokenizer": TOKENIZER, "stemmer": type(stemmer).__name__, "featurizer": FEATURIZER}
+    if FEATURIZER == "hashed":
+        settings.update(n_buckets=HASH_BUCKETS, bigrams=HASH_BIGRAMS)
+    return settings
+
+def tokenizer_parity(sentences):
+    """
+    compare the regex and nltk tokenizers:
+    return (sentence, nltk_tokens, regex_tokens) for every sentence where they disagree
+    """
+    mismatches = []
+    for sentence in sentences:
+        nltk_tokens = tokenize(sentence, "nltk")
+        regex_tokens = tokenize(sentence, "regex")
+        if nltk_tokens != regex_tokens:
+            mismatches.append((sentence, nltk_tokens, regex_tokens))
+    return mismatches
 
 def stem(word):
-    return stemmer.stem(word.lower())
+    return _cached_stem(word.lower())
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def _cached_stem(word):
+    return stemmer.stem(word)
+
+def stem_cache_info():
+    """return hits, misses, maxsize and currsize of the stem cache"""
+    return _cached_stem.cache_info()
+
+def clear_stem_cache():
+    _cached_stem.cache_clear()
+
+def warm_stem_cache(words):
+    """
+    pre-stem raw tokens (e.g. data["pattern_words"]) so later lookups hit the cache,
+    the cache is keyed by the lowercased token, not by its stem
+    """
+    for word in words:
+        stem(word)
+
+class Featurizer(ABC):
+    """
+    base class: subclasses implement lookup(), settings() and __len__(),
+    the dense and sparse bag of words outputs are shared
+    """
+    @abstractmethod
+    def __len__(self):
+        """return the number of model inputs"""
+
+    @abstractmethod
+    def lookup(self, tokenized_sentence):
+        """return the sorted indices of the active inputs for the sentence as a list"""
+
+    @abstractmethod
+    def settings(self):
+        """return the dict saved in data.pth to rebuild this featurizer"""
+
+    def indices(self, tokenized_sentence):
+        """
+        return sparse bag of words:
+        sorted int64 indices of the active inputs for the sentence
+        """
+        return np.array(self.lookup(tokenized_sentence), dtype=np.int64)
+
+    def bag_of_words(self, tokenized_sentence, sparse=False):
+        indices = self.indices(tokenized_sentence)
+        if sparse:
+            return indices
+        bag = np.zeros(len(self), dtype=np.float32)
+        bag[indices] = 1.0
+        return bag
+
+class Vocabulary(Featurizer):
+    """
+    maps each stemmed word of all_words to its index,
+    built once so featurizing a sentence only costs its number of tokens
+    """
+    def __init__(self, words):
+        self.words = list(words)
+        self.index = {w: idx for idx, w in enumerate(self.words)}
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def lookup(self, tokenized_sentence):
+        """return the sorted indices of the known words in the sentence as a list"""
+        found = set()
+        for word in tokenized_sentence:
+            idx = self.index.get(stem(word))
+            if idx is not None:
+                found.add(idx)
+        return sorted(found)
+
+    def settings(self):
+        return {"type": "vocab"}
+
+class HashedFeaturizer(Featurizer):
+    """
+    hashing trick: each stem (and word bigram, if enabled) sets the bucket
+    crc32(feature) % n_buckets, so the input width stays fixed as the intents grow
+    and inference needs no all_words list
+    """
+    def __init__(self, n_buckets=HASH_BUCKETS, bigrams=HASH_BIGRAMS, ignore_words=IGNORE_WORDS):
+        self.n_buckets = n_buckets
+        self.bigrams = bigrams
+        self.ignore_words = set(ignore_words)
+
+    def __len__(self):
+        return self.n_buckets
+
+    def bucket(self, feature):
+        # crc32 is stable across processes, unlike the salted built-in hash()
+        return zlib.crc32(feature.encode("utf-8")) % self.n_buckets
+
+    def lookup(self, tokenized_sentence):
+        stems = [stem(w) for w in tokenized_sentence if w not in self.ignore_words]
+        found = {self.bucket(s) for s in stems}
+        if self.bigrams:
+            found.update(self.bucket(f"{a} {b}") for a, b in zip(stems, stems[1:]))
+        return sorted(found)
+
+    def settings(self):
+        return {"type": "hashed", "n_buckets": self.n_buckets, "bigrams": self.bigrams}
 
-def bag_of_words(tokenized_sentence, words):
+def make_featurizer(settings=None, all_words=None):
+    """
+    build the featurizer described by settings (as saved in data.pth),
+    defaults to the module-level FEATURIZER / HASH_* settings
+    """
+    if settings is None:
+        settings = {"type": FEATURIZER, "n_buckets": HASH_BUCKETS, "bigrams": HASH_BIGRAMS}
+    if settings["type"] == "vocab":
+        return Vocabulary(all_words)
+    if settings["type"] == "hashed":
+        return HashedFeaturizer(settings["n_buckets"], settings["bigrams"])
+    raise ValueError(f"Unknown featurizer: {settings['type']} (expected one of {FEATURIZERS})")
+
+def bag_of_words(tokenized_sentence, words, sparse=False):
     """
     return bag of words array:
     1 for each known word that exists in the sentence, 0 otherwise
+    words can be a list of stems or a prebuilt Featurizer (much faster when reused)
+    with sparse=True only the indices of the 1 entries are returned
+    """
+    if not isinstance(words, Featurizer):
+        words = Vocabulary(words)
+    return words.bag_of_words(tokenized_sentence, sparse=sparse)
+
+def bag_of_words_batch(tokenized_sentences, words, sparse=False):
+    """
+    featurize many tokenized sentences in one pass:
+    returns a preallocated (n_sentences, n_words) float32 matrix,
+    or a scipy CSR matrix with sparse=True
     """
-    sentence_words = [stem(word) for word in tokenized_sentence]
-    bag = np.zeros(len(words), dtype=np.float32)
-    for idx, w in enumerate(words):
-        if w in sentence_words:
-            bag[idx] = 1.0
+    if not isinstance(words, Featurizer):
+        words = Vocabulary(words)
+
+    # Collect the column indices of every row into one flat list (CSR layout)
+    indptr = [0]
+    cols = []
+    for sentence in tokenized_sentences:
+        cols.extend(words.lookup(sentence))
+        indptr.append(len(cols))
+    indptr = np.array(indptr, dtype=np.int64)
+    cols = np.array(cols, dtype=np.int64)
+    n_rows = len(indptr) - 1
+
+    if sparse:
+        try:
+            from scipy.sparse import csr_matrix
+        except ImportError:
+            raise ImportError("sparse=True needs scipy: pip install scipy")
+        data = np.ones(len(cols), dtype=np.float32)
+        return csr_matrix((data, cols, indptr), shape=(n_rows, len(words)))
+
+    bag = np.zeros((n_rows, len(words)), dtype=np.float32)
+    rows = np.repeat(np.arange(n_rows), np.diff(indptr))
+    bag[rows, cols] = 1.0
     return bag
+
+if __name__ == "__main__":
+    import json
+
+    # Tokenizer parity report on the intents corpus
+    with open("intents.json", "r") as f:
+        intents = json.load(f)
+    patterns = [pattern for intent in intents["intents"] for pattern in intent["patterns"]]
+
+    mismatches = tokenizer_parity(patterns)
+    print(f"Tokenizer parity: {len(patterns) - len(mismatches)}/{len(patterns)} patterns identical")
+    for sentence, nltk_tokens, regex_tokens in mismatches:
+        print(f"  {sentence!r}")
+        print(f"    nltk:  {nltk_tokens}")
+        print(f"    regex: {regex_tokens}")
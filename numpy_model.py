@@ -0,0 +1,231 @@
+# numpy_model.py
+# Torch-free inference for model.NeuralNet: the three linear layers run as NumPy matmuls
+
+import json
+import sys
+
+import numpy as np
+
+NUMPY_FILE = "data.npz"
+INT8_FILE = "data_int8.npz"
+LAYERS = ("l1", "l2", "l3")
+
+def quantize_int8(weight):
+    """Symmetric per-output-row int8 quantization, returns (int8 weight, float32 scale per row)"""
+    scale = np.abs(weight).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    quantized = np.clip(np.round(weight / scale[:, np.newaxis]), -127, 127).astype(np.int8)
+    return quantized, scale.astype(np.float32)
+
+def export_numpy(data_file="data.pth", out_file=NUMPY_FILE, quantize=False):
+    """
+    Writes the model_state weights and metadata of a torch checkpoint to a plain .npz archive,
+    with quantize=True the linear weights are stored as int8 plus a float32 scale per output row
+    """
+    import torch
+
+    data = torch.load(data_file)
+    arrays = {name: tensor.detach().cpu().numpy() for name, tensor in data["model_state"].items()}
+    meta = {key: value for key, value in data.items()
+            if key not in ("model_state", "all_words", "pattern_words", "tags")}
+    if quantize:
+        for layer in LAYERS:
+            arrays[f"{layer}.weight"], arrays[f"{layer}.scale"] = quantize_int8(arrays[f"{layer}.weight"])
+        meta["quantization"] = "int8"
+    np.savez(out_file,
+             meta=np.array(json.dumps(meta)),
+             all_words=np.array(data["all_words"], dtype=str),
+             tags=np.array(data["tags"], dtype=str),
+             pattern_words=np.array(data.get("pattern_words", []), dtype=str),
+             **arrays)
+    return out_file
+
+def load_numpy(file=NUMPY_FILE):
+    """Loads an exported archive into the same dict layout as torch.load("data.pth")"""
+    with np.load(file, allow_pickle=False) as archive:
+        data = json.loads(archive["meta"].item())
+        data["all_words"] = archive["all_words"].tolist()
+        data["tags"] = archive["tags"].tolist()
+        if "pattern_words" in archive.files:
+            data["pattern_words"] = archive["pattern_words"].tolist()
+        params = ("weight", "bias", "scale") if data.get("quantization") == "int8" else ("weight", "bias")
+        data["model_state"] = {f"{layer}.{param}": archive[f"{layer}.{param}"]
+                               for layer in LAYERS for param in params}
+    return data
+
+def make_numpy_model(data):
+    """Returns the float or int8 NumPy model matching a load_numpy() dict"""
+    if data.get("quantization") == "int8":
+        return QuantizedNeuralNet(data["model_state"])
+    return NumpyNeuralNet(data["model_state"])
+
+def softmax(logits):
+    """Row-wise softmax of a 2-D logits array"""
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+class NumpyNeuralNet:
+    """Same forward pass as model.NeuralNet, on float32 NumPy arrays"""
+    def __init__(self, model_state):
+        # Keep transposed, contiguous weights so every layer is a plain x @ W
+        self.weights = [np.ascontiguousarray(model_state[f"{layer}.weight"].T, dtype=np.float32)
+                        for layer in LAYERS]
+        self.biases = [np.asarray(model_state[f"{layer}.bias"], dtype=np.float32)
+                       for layer in LAYERS]
+
+    def forward(self, x):
+        """x: (batch, input_size) float32 bag of words, returns (batch, output_size) logits"""
+        out = x @ self.weights[0] + self.biases[0]
+        return self._hidden(out)
+
+    def forward_sparse(self, indices):
+        """indices of the 1 entries of a single bag of words, returns (1, output_size) logits"""
+        out = self.weights[0][indices].sum(axis=0) + self.biases[0]
+        return self._hidden(out[np.newaxis, :])
+
+    def _hidden(self, out):
+        out = np.maximum(out, 0)
+        out = out @ self.weights[1] + self.biases[1]
+        out = np.maximum(out, 0)
+        out = out @ self.weights[2] + self.biases[2]
+        return out
+
+    __call__ = forward
+
+class QuantizedNeuralNet:
+    """
+    int8 version of NumpyNeuralNet: weights stay int8 in memory (4x smaller than float32).
+    Each matmul dequantizes BLOCK_ROWS weight rows at a time into a small float32 buffer and
+    runs a float GEMM on them, so no full-size copy of a weight matrix is ever made; the
+    per-output scale is applied once to the result.
+    This trades latency for memory: the per-call dequantization makes it slower
+    than NumpyNeuralNet on both the batch and the sparse path (see benchmark()), so use it
+    where the 4x smaller weights matter, not for speed
+    """
+    BLOCK_ROWS = 1024  # 1024 x 64 hidden units = 256 KB of float32, stays in cache
+
+    def __init__(self, model_state):
+        self.weights = [np.ascontiguousarray(model_state[f"{layer}.weight"].T) for layer in LAYERS]
+        self.scales = [np.asarray(model_state[f"{layer}.scale"], dtype=np.float32) for layer in LAYERS]
+        self.biases = [np.asarray(model_state[f"{layer}.bias"], dtype=np.float32) for layer in LAYERS]
+
+    def _linear(self, i, x):
+        weight = self.weights[i]
+        rows, cols = weight.shape
+        block = np.empty((min(rows, self.BLOCK_ROWS), cols), dtype=np.float32)
+        out = np.zeros((len(x), cols), dtype=np.float32)
+        part = np.empty_like(out)
+        for start in range(0, rows, self.BLOCK_ROWS):
+            w = weight[start:start + self.BLOCK_ROWS]
+            b = block[:len(w)]
+            np.copyto(b, w, casting='unsafe')
+            np.matmul(x[:, start:start + len(w)], b, out=part)
+            out += part
+        out *= self.scales[i]
+        out += self.biases[i]
+        return out
+
+    def forward(self, x):
+        """x: (batch, input_size) float32 bag of words, returns (batch, output_size) logits"""
+        out = self._linear(0, np.asarray(x, dtype=np.float32))
+        return self._hidden(out)
+
+    def forward_sparse(self, indices):
+        """
+        indices of the 1 entries of a single bag of words: only those int8 rows are read and
+        summed in int32, so the first layer needs no float copy of its weights
+        """
+        acc = self.weights[0][indices].sum(axis=0, dtype=np.int32)
+        out = acc * self.scales[0] + self.biases[0]
+        return self._hidden(out[np.newaxis, :])
+
+    def _hidden(self, out):
+        out = np.maximum(out, 0)
+        out = self._linear(1, out)
+        out = np.maximum(out, 0)
+        return self._linear(2, out)
+
+    __call__ = forward
+
+def check_parity(data_file="data.pth", numpy_file=NUMPY_FILE, intents_file="intents.json"):
+    """
+    Runs every intents pattern through the torch model and the exported (float or int8) NumPy model,
+    returns (argmax matches, max prob diff, count)
+    """
+    import torch
+    from model import NeuralNet
+    from nltk_utils import LEGACY_TOKENIZER, bag_of_words_batch, make_featurizer, tokenize
+
+    data = torch.load(data_file)
+    torch_model = NeuralNet(data["input_size"], data["hidden_size"], data["output_size"])
+    torch_model.load_state_dict(data["model_state"])
+    torch_model.eval()
+    numpy_model = make_numpy_model(load_numpy(numpy_file))
+
+    tokenizer = data.get("tokenizer", LEGACY_TOKENIZER)
+    featurizer = make_featurizer(data.get("featurizer", {"type": "vocab"}), data["all_words"])
+    with open(intents_file, "r") as f:
+        intents = json.load(f)
+    patterns = [tokenize(p, tokenizer) for intent in intents["intents"] for p in intent["patterns"]]
+    X = bag_of_words_batch(patterns, featurizer)
+
+    with torch.no_grad():
+        torch_probs = torch.softmax(torch_model(torch.from_numpy(X)), dim=1).numpy()
+    numpy_probs = softmax(numpy_model(X))
+    matches = int((torch_probs.argmax(axis=1) == numpy_probs.argmax(axis=1)).sum())
+    return matches, float(np.abs(torch_probs - numpy_probs).max()), len(X)
+
+def benchmark(input_size=20000, hidden_size=64, output_size=32, batch=256, active=12, repeats=20):
+    """
+    Float vs int8 model on random weights of the given size: ms per batch forward, us per
+    forward_sparse, weight bytes, and the peak memory traced during one batch forward
+    (the int8 model's scratch buffers; a full-size dequantized copy would show up here)
+    """
+    import time
+    import tracemalloc
+
+    rng = np.random.default_rng(0)
+    sizes = ((hidden_size, input_size), (hidden_size, hidden_size), (output_size, hidden_size))
+    model_state = {}
+    for layer, (rows, cols) in zip(LAYERS, sizes):
+        model_state[f"{layer}.weight"] = rng.normal(0, cols ** -0.5, (rows, cols)).astype(np.float32)
+        model_state[f"{layer}.bias"] = rng.normal(0, 0.1, rows).astype(np.float32)
+    quantized_state = dict(model_state)
+    for layer in LAYERS:
+        quantized_state[f"{layer}.weight"], quantized_state[f"{layer}.scale"] = quantize_int8(model_state[f"{layer}.weight"])
+
+    X = np.zeros((batch, input_size), dtype=np.float32)
+    for row in X:
+        row[rng.choice(input_size, active, replace=False)] = 1.0
+    indices = np.flatnonzero(X[0])
+
+    def per_call(fn, *args):
+        fn(*args)  # warm up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn(*args)
+        return (time.perf_counter() - start) / repeats
+
+    print(f"Layers {input_size}x{hidden_size}x{hidden_size}x{output_size}, batch {batch}:")
+    for name, model in (("float", NumpyNeuralNet(model_state)), ("int8", QuantizedNeuralNet(quantized_state))):
+        batch_ms = per_call(model.forward, X) * 1000
+        sparse_us = per_call(model.forward_sparse, indices) * 1e6
+        tracemalloc.start()
+        model.forward(X)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        weight_bytes = sum(w.nbytes for w in model.weights)
+        print(f"  {name:5}: {batch_ms:7.2f} ms per batch, {sparse_us:6.1f} us sparse, "
+              f"weights {weight_bytes / 1024:.0f} KB, peak during forward {peak / 1024:.0f} KB")
+
+if __name__ == "__main__":
+    # python numpy_model.py [--int8]
+    quantize = "--int8" in sys.argv[1:]
+    out_file = export_numpy(out_file=INT8_FILE if quantize else NUMPY_FILE, quantize=quantize)
+    print(f"Exported {'int8' if quantize else 'NumPy'} weights to {out_file}")
+    matches, max_diff, total = check_parity(numpy_file=out_file)
+    print(f"Parity: {matches}/{total} argmax identical, max probability difference {max_diff:.2e}")
+    if quantize:
+        benchmark()
+        print("int8 trades latency for memory: 4x smaller weights, slower inference than float (see above)")
@@ -0,0 +1,230 @@
+# pipeline.py
+# Staged worker pipeline: one thread per stage, bounded queues in between,
+# per-stage queue depth and latency
+
+import queue
+import threading
+import time
+
+STOP = object()  # sentinel passed down the stages on shutdown
+
+class Failed:
+    """Passed downstream in place of the result when a stage raised on an item"""
+    def __init__(self, stage, item, error):
+        self.stage = stage
+        self.item = item
+        self.error = error
+
+    def __repr__(self):
+        return f"Failed({self.stage!r}, {self.error!r})"
+
+class StageStats:
+    """Latency counters for one stage (thread-safe)"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, seconds):
+        with self.lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self.last = seconds
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "processed": self.count,
+                "avg_ms": 1000 * self.total / self.count if self.count else 0.0,
+                "max_ms": 1000 * self.max,
+                "last_ms": 1000 * self.last,
+            }
+
+class Pipeline:
+    """
+    Linear chain of worker stages. Each stage runs fn(item) on its own thread, in order,
+    and passes non-None results to the next bounded queue; a full queue blocks the stage
+    before it (backpressure). Sources are threads that call produce() in a loop and feed
+    the first stage. With one worker per stage, items come out in the order they went in.
+    An exception in fn is printed, counted for that stage and turned into a Failed marker
+    that later stages pass through untouched; one in produce() is printed and counted, and
+    the source is called again after retry_delay. Items are tagged with the generation they
+    were put in; pause() starts a new one, so whatever was still in flight is dropped.
+    """
+    def __init__(self, maxsize=2, retry_delay=0.5):
+        self.maxsize = maxsize
+        self.retry_delay = retry_delay  # pause after a source raised, before it is called again
+        self.inbox = queue.Queue(maxsize)
+        self.outbox = self.inbox
+        self.stages = []  # (name, fn, inbox, outbox)
+        self.sources = []  # (name, produce)
+        self.stats_by_stage = {}
+        self.failures = {}
+        self.queues = {}
+        self.threads = []
+        self.stop_event = threading.Event()
+        self.running = threading.Event()  # sources only produce while set
+        self.running.set()
+        self.generation = 0
+        self.pending = 0  # items put but not yet out of the last stage
+        self.pending_cond = threading.Condition()
+
+    def add_stage(self, name, fn):
+        outbox = queue.Queue(self.maxsize)
+        self.stages.append((name, fn, self.outbox, outbox))
+        self.stats_by_stage[name] = StageStats()
+        self.failures[name] = 0
+        self.queues[name] = self.outbox
+        self.outbox = outbox
+        return self
+
+    def add_source(self, name, produce):
+        self.sources.append((name, produce))
+        self.stats_by_stage[name] = StageStats()
+        self.failures[name] = 0
+        return self
+
+    def start(self):
+        for name, fn, inbox, outbox in self.stages:
+            self._spawn(self._run_stage, name, fn, inbox, outbox)
+        for name, produce in self.sources:
+            self._spawn(self._run_source, name, produce)
+        return self
+
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args, name=f"pipeline-{args[0]}", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _run_stage(self, name, fn, inbox, outbox):
+        stats = self.stats_by_stage[name]
+        while True:
+            tagged = inbox.get()
+            if tagged is STOP:
+                outbox.put(STOP)
+                return
+            generation, item = tagged
+            if generation != self.generation:
+                self._done()  # from before a pause: not worth the work
+                continue
+            if isinstance(item, Failed):
+                outbox.put(tagged)
+                continue
+            start = time.perf_counter()
+            try:
+                result = fn(item)
+            except Exception as e:
+                print(f"Pipeline stage {name} failed: {e!r}")
+                self.failures[name] += 1
+                result = Failed(name, item, e)
+            stats.record(time.perf_counter() - start)
+            if result is None:
+                self._done()
+            else:
+                outbox.put((generation, result))
+
+    def _run_source(self, name, produce):
+        stats = self.stats_by_stage[name]
+        while not self.stop_event.is_set():
+            if not self.running.wait(timeout=0.1):
+                continue
+            generation = self.generation
+            start = time.perf_counter()
+            try:
+                item = produce()
+            except Exception as e:
+                # Keep the source alive (e.g. a stalled device): report, back off, try again
+                print(f"Pipeline source {name} failed: {e!r}")
+                self.failures[name] += 1
+                self.stop_event.wait(self.retry_delay)
+                continue
+            if item is None or generation != self.generation:
+                continue
+            stats.record(time.perf_counter() - start)
+            while not self.stop_event.is_set():
+                try:
+                    self._put(generation, item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def _done(self):
+        with self.pending_cond:
+            self.pending -= 1
+            self.pending_cond.notify_all()
+
+    def put(self, item, timeout=None):
+        """Feeds the first stage; blocks (up to timeout) while its queue is full"""
+        self._put(self.generation, item, timeout)
+
+    def _put(self, generation, item, timeout):
+        with self.pending_cond:
+            self.pending += 1
+        try:
+            self.inbox.put((generation, item), timeout=timeout)
+        except queue.Full:
+            self._done()
+            raise
+
+    def get(self, timeout=None):
+        """
+        Next result (or Failed marker) out of the last stage, skipping results from before
+        the last pause(); raises queue.Empty on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            tagged = self.outbox.get(timeout=remaining)
+            if tagged is STOP:
+                return STOP
+            self._done()
+            generation, item = tagged
+            if generation == self.generation:
+                return item
+
+    def pause(self):
+        """
+        Stops the sources taking new input and drops everything in flight: a source that is
+        mid-produce() finishes, but its item and all queued ones are discarded
+        """
+        self.running.clear()
+        self.generation += 1
+
+    def resume(self):
+        self.running.set()
+
+    def record(self, name, seconds):
+        """Latency of a stage run outside the pipeline threads (e.g. on the main thread)"""
+        self.stats_by_stage.setdefault(name, StageStats()).record(seconds)
+
+    def idle(self):
+        with self.pending_cond:
+            return self.pending == 0
+
+    def join(self, timeout=None):
+        """Waits until every item put so far has left the last stage"""
+        with self.pending_cond:
+            return self.pending_cond.wait_for(lambda: self.pending == 0, timeout=timeout)
+
+    def stop(self):
+        """Stops the sources and lets STOP flow through the stages (daemon threads, nothing is joined)"""
+        self.stop_event.set()
+        try:
+            self.inbox.put_nowait(STOP)
+        except queue.Full:
+            pass
+
+    def stats(self):
+        """
+        {stage: {"depth", "failed", "processed", "avg_ms", "max_ms", "last_ms"}}
+        (depth = items waiting for it, failed = items fn raised on)
+        """
+        report = {}
+        for name, stats in self.stats_by_stage.items():
+            waiting = self.queues.get(name)
+            report[name] = dict(depth=waiting.qsize() if waiting else 0,
+                                failed=self.failures.get(name, 0), **stats.snapshot())
+        return report
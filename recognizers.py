@@ -0,0 +1,255 @@
+# recognizers.py
+# Pluggable speech-to-text backends with an ordered fallback chain
+
+import http.client
+import json
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import urlencode, urlsplit
+
+import speech_recognition as sr
+
+from audio_encoding import encode_flac
+from pipeline import StageStats
+
+def audio_duration(audio_data):
+    """Seconds of audio in an sr.AudioData"""
+    return len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width)
+
+class RecognizerBackend(ABC):
+    """
+    Base class: recognize(audio_data) returns the transcript, raises sr.UnknownValueError
+    when the speech wasn't understood and sr.RequestError when the engine is unavailable
+    """
+    name = "base"
+
+    def __init__(self, **settings):
+        self.settings = settings
+
+    @abstractmethod
+    def recognize(self, audio_data):
+        """Transcript of one sr.AudioData"""
+
+class KeepAliveClient:
+    """
+    One persistent HTTP(S) connection to a host, reused across turns (no TCP/TLS handshake
+    per utterance) and reopened if the server closed it. post() also splits the request time
+    into upload (sending the body) and wait (until the response has been read).
+    Only a connection the server dropped is retried; timeouts and other errors are raised
+    at once (a timed-out request may still be processing, and retrying doubles the wait).
+    """
+    STALE = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+    def __init__(self, url, timeout=10):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.path = parts.path
+        self.timeout = timeout
+        self.connection = None
+        self.connects = 0
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection_class(self.host, timeout=self.timeout)
+        self.connects += 1
+
+    def post(self, query, body, headers):
+        """Returns (status, response bytes, upload seconds, wait seconds)"""
+        for attempt in range(2):
+            if self.connection is None:
+                self._connect()
+            try:
+                start = time.perf_counter()
+                self.connection.request("POST", f"{self.path}?{query}", body=body, headers=headers)
+                sent = time.perf_counter()
+                response = self.connection.getresponse()
+                data = response.read()
+                return response.status, data, sent - start, time.perf_counter() - sent
+            except self.STALE:
+                # Stale keep-alive connection: reconnect once, then give up
+                self.close()
+                if attempt:
+                    raise
+            except (http.client.HTTPException, OSError):
+                self.close()
+                raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+class GoogleBackend(RecognizerBackend):
+    """
+    Google Web Speech API (same protocol as Recognizer.recognize_google), over a pooled
+    keep-alive connection; last_timing holds the encode / upload / wait split of the last call.
+    The v2 endpoint is the undocumented one Chrome uses, not a public API: it may change or
+    be rate limited without notice. The API key comes from "recognizer" -> "google" -> "key"
+    in config.json; without one the backend reports itself unavailable.
+    """
+    name = "google"
+    ENDPOINT = "http://www.google.com/speech-api/v2/recognize"
+
+    def __init__(self, language="en-IN", key=None, endpoint=ENDPOINT, timeout=10, **settings):
+        super(GoogleBackend, self).__init__(**settings)
+        self.language = language
+        self.key = key
+        self.client = KeepAliveClient(endpoint, timeout=timeout)
+        self.last_timing = {}
+
+    def recognize(self, audio_data):
+        if not self.key:
+            raise sr.RequestError("no Google API key (set recognizer.google.key in config.json)")
+        start = time.perf_counter()
+        flac_data = encode_flac(audio_data)
+        encode = time.perf_counter() - start
+
+        query = urlencode({"client": "chromium", "lang": self.language, "key": self.key, "pFilter": 0})
+        headers = {"Content-Type": f"audio/x-flac; rate={audio_data.sample_rate}", "Connection": "keep-alive"}
+        try:
+            status, data, upload, wait = self.client.post(query, flac_data, headers)
+        except (http.client.HTTPException, OSError) as e:
+            raise sr.RequestError(f"recognition connection failed: {e}")
+        self.last_timing = {"encode": encode, "upload": upload, "wait": wait, "bytes": len(flac_data)}
+        if status != 200:
+            raise sr.RequestError(f"recognition request failed: HTTP {status}")
+        return self.parse(data.decode("utf-8"))
+
+    @staticmethod
+    def parse(response_text):
+        """First non-empty result of the line-delimited JSON response, best alternative first"""
+        for line in response_text.split("\n"):
+            if not line:
+                continue
+            result = json.loads(line).get("result", [])
+            if result:
+                alternatives = result[0].get("alternative", [])
+                if not alternatives:
+                    break
+                best = next((a for a in alternatives if "confidence" in a), alternatives[0])
+                return best["transcript"]
+        raise sr.UnknownValueError()
+
+class SphinxBackend(RecognizerBackend):
+    """CMU PocketSphinx: fully local and offline (pip install pocketsphinx)"""
+    name = "sphinx"
+
+    def __init__(self, language="en-US", recognizer=None, **settings):
+        super(SphinxBackend, self).__init__(**settings)
+        self.language = language
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def recognize(self, audio_data):
+        return self.recognizer.recognize_sphinx(audio_data, language=self.language)
+
+class TranscriptBackend(RecognizerBackend):
+    """
+    Deterministic stand-in for tests and benchmarks: ignores the audio and returns the lines
+    of a transcript file in order (an empty line means "not understood"), after an optional
+    fixed latency_s to mimic a real engine
+    """
+    name = "transcript"
+
+    def __init__(self, file="transcript.txt", latency_s=0.0, lines=None, **settings):
+        super(TranscriptBackend, self).__init__(**settings)
+        if lines is None:
+            with open(file, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        self.lines = list(lines)
+        self.latency_s = latency_s
+        self.position = 0
+
+    def recognize(self, audio_data):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if self.position >= len(self.lines):
+            raise sr.UnknownValueError()
+        text = self.lines[self.position].strip()
+        self.position += 1
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, SphinxBackend, TranscriptBackend)}
+
+class RecognitionService:
+    """
+    Long-lived recognition shared by every turn: backends (and their pooled connections and
+    sr.Recognizer) are built once. Backends are tried in order: one that is unavailable
+    (RequestError, missing package, any other failure) hands over to the next one;
+    "not understood" is final. Latency is recorded per backend, and per phase
+    (encode / upload / wait) for backends that report last_timing.
+    """
+    PHASES = ("encode", "upload", "wait")
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.latency = {backend.name: StageStats() for backend in backends}
+        self.failures = {backend.name: 0 for backend in backends}
+        self.phases = {phase: StageStats() for phase in self.PHASES}
+        self.last_backend = None
+        self.last_timing = {}
+        self.audio_seconds = 0.0  # audio handed to backends, all turns
+        self.bytes_sent = 0  # payload uploaded by remote backends, all turns
+
+    def recognize(self, audio_data):
+        errors = []
+        self.audio_seconds += audio_duration(audio_data)
+        for backend in self.backends:
+            start = time.perf_counter()
+            try:
+                text = backend.recognize(audio_data)
+            except sr.UnknownValueError:
+                self._record(backend, audio_data, time.perf_counter() - start)
+                raise
+            except Exception as e:
+                self.failures[backend.name] += 1
+                errors.append(f"{backend.name}: {e}")
+                continue
+            self._record(backend, audio_data, time.perf_counter() - start)
+            return text
+        raise sr.RequestError("; ".join(errors) or "no recognizer backends configured")
+
+    def _record(self, backend, audio_data, seconds):
+        self.latency[backend.name].record(seconds)
+        self.last_backend = backend.name
+        self.last_timing = dict(getattr(backend, "last_timing", {}), total=seconds,
+                                audio_s=audio_duration(audio_data))
+        self.bytes_sent += self.last_timing.get("bytes", 0)
+        for phase in self.PHASES:
+            if phase in self.last_timing:
+                self.phases[phase].record(self.last_timing[phase])
+
+    def stats(self):
+        """{backend: {"processed", "avg_ms", "max_ms", "last_ms", "failures"}}"""
+        return {name: dict(failures=self.failures[name], **stats.snapshot())
+                for name, stats in self.latency.items()}
+
+    def phase_stats(self):
+        """{"encode" | "upload" | "wait": {"processed", "avg_ms", "max_ms", "last_ms"}}"""
+        return {phase: stats.snapshot() for phase, stats in self.phases.items() if stats.count}
+
+    def close(self):
+        for backend in self.backends:
+            client = getattr(backend, "client", None)
+            if client is not None:
+                client.close()
+
+def make_recognizer(settings):
+    """
+    Builds the recognition service from the "recognizer" section of config.json, e.g.
+    {"backends": ["google", "sphinx"], "google": {"language": "en-IN"}}
+    """
+    names = settings.get("backends", ["google"])
+    unknown = [name for name in names if name not in BACKENDS]
+    if unknown:
+        raise ValueError(f"Unknown recognizer backend(s): {unknown} (expected some of {list(BACKENDS)})")
+    recognizer = sr.Recognizer()  # shared by the backends built on SpeechRecognition
+    backends = []
+    for name in names:
+        options = dict(settings.get(name, {}))
+        if name == "sphinx":
+            options.setdefault("recognizer", recognizer)
+        backends.append(BACKENDS[name](**options))
+    return RecognitionService(backends)
@@ -1,27 +1,136 @@
+# test_mic.py
+# Microphone profiler: tries every input device, measures how long it takes to open,
+# which sample rates it supports natively and its noise floor, then saves the best one
+# to audio_device.json, which the chatbot reads at startup. The chatbot records at 16 kHz
+# and doesn't resample, so only devices with native 16 kHz input are candidates.
+#
+#   python test_mic.py            profile all inputs (keep quiet while it measures)
+#   python test_mic.py --show     print the cached choice
+
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
 import sounddevice as sd
 import numpy as np
 
-# List all audio devices
-print("Available audio devices:")
-print(sd.query_devices())
-
-# Test default microphone
-print("\nTesting default microphone...")
-duration = 5  # seconds
-fs = 44100  # sample rate
-
-try:
-    print("Recording for 5 seconds...")
-    recording = sd.rec(int(duration * fs), samplerate=fs, channels=1)
-    sd.wait()  # Wait until recording is finished
-    print("Recording complete!")
-    
-    # Check if audio was captured
-    if np.max(np.abs(recording)) > 0.01:  # Threshold for silence
-        print("Microphone is working properly!")
-    else:
-        print("Warning: No significant audio detected")
-        
-except Exception as e:
-    print(f"Error: {e}")
-    print("Microphone test failed")
\ No newline at end of file
+from audio_capture import DEVICE_CACHE_FILE, load_device_choice
+
+TARGET_RATE = 16000  # what the chatbot records at (the only rate a device is measured at)
+RATES = (16000, 8000, 22050, 32000, 44100, 48000)
+NOISE_SECONDS = 1.0
+SILENT_DB = -90  # a floor this low means digital silence: muted or not a real microphone
+LIVE_LEVELS = 8  # a live input shows at least this many distinct sample values in quiet
+
+def supported_rates(device):
+    rates = []
+    for rate in RATES:
+        try:
+            sd.check_input_settings(device=device, samplerate=rate, channels=1, dtype='int16')
+            rates.append(rate)
+        except Exception:
+            pass
+    return rates
+
+def measure(device, samplerate):
+    """
+    Open latency (stream start until the first block arrives), noise floor in dBFS, stream
+    latency and the number of distinct sample values (a muted input repeats one or two)
+    """
+    samples = np.zeros(int(NOISE_SECONDS * samplerate), dtype=np.int16)
+    filled = [0]
+    first_block = threading.Event()
+    done = threading.Event()
+
+    def callback(indata, frames, time_info, status):
+        first_block.set()
+        n = min(frames, len(samples) - filled[0])
+        samples[filled[0]:filled[0] + n] = indata[:n, 0]
+        filled[0] += n
+        if filled[0] >= len(samples):
+            done.set()
+
+    start = time.perf_counter()
+    stream = sd.InputStream(device=device, samplerate=samplerate, channels=1, dtype='int16', callback=callback)
+    stream.start()
+    try:
+        if not first_block.wait(timeout=2.0):
+            raise TimeoutError("no audio within 2 s")
+        open_latency = time.perf_counter() - start
+        stream_latency = getattr(stream, "latency", None)
+        done.wait(timeout=NOISE_SECONDS + 2.0)
+    finally:
+        stream.stop()
+        stream.close()
+
+    recorded = samples[:filled[0]].astype(np.float64)
+    rms = np.sqrt(np.mean((recorded - recorded.mean()) ** 2)) if len(recorded) else 0.0
+    noise_floor_db = 20 * np.log10(rms / 32768.0 + 1e-10)
+    levels = len(np.unique(samples[:filled[0]]))
+    return open_latency, float(noise_floor_db), stream_latency, levels
+
+def profile_devices():
+    profiles = []
+    for index, info in enumerate(sd.query_devices()):
+        if info['max_input_channels'] < 1:
+            continue
+        profile = {"device": index, "name": info['name'],
+                   "default_samplerate": info['default_samplerate']}
+        print(f"\n[{index}] {info['name']}")
+        try:
+            profile["rates"] = supported_rates(index)
+            print(f"  rates: {profile['rates']}")
+            if TARGET_RATE not in profile["rates"]:
+                raise ValueError(f"no native {TARGET_RATE} Hz input")
+            open_latency, noise_floor_db, stream_latency, levels = measure(index, TARGET_RATE)
+            profile.update(samplerate=TARGET_RATE, open_latency_ms=open_latency * 1000,
+                           noise_floor_db=noise_floor_db, stream_latency_ms=(stream_latency or 0) * 1000,
+                           levels=levels, live=noise_floor_db > SILENT_DB and levels >= LIVE_LEVELS)
+            print(f"  open latency: {profile['open_latency_ms']:.0f} ms, noise floor: {noise_floor_db:.1f} dBFS")
+            if not profile["live"]:
+                print("  no live signal (muted or disconnected?)")
+        except Exception as e:
+            profile["error"] = str(e)
+            print(f"  failed: {e}")
+        profiles.append(profile)
+    return profiles
+
+def default_input():
+    """Index of the system default input device, or None"""
+    try:
+        return sd.query_devices(kind='input')['index']
+    except Exception:
+        return None
+
+def best_device(profiles):
+    """
+    Usable devices only (native 16 kHz, opened, live signal); prefer the system default input,
+    then the faster open. The noise floor only decides liveness: ranking on the quietest
+    floor would favour muted and barely connected inputs.
+    """
+    usable = [p for p in profiles if "error" not in p and p["live"]]
+    if not usable:
+        return None
+    default = default_input()
+    return min(usable, key=lambda p: (p["device"] != default, p["open_latency_ms"]))
+
+if __name__ == "__main__":
+    if "--show" in sys.argv:
+        print(json.dumps(load_device_choice(), indent=4))
+        sys.exit()
+
+    print("Profiling input devices, please keep quiet...")
+    profiles = profile_devices()
+    best = best_device(profiles)
+    if best is None:
+        print(f"\nNo working microphone found (needs native {TARGET_RATE} Hz input and a live signal)")
+        sys.exit(1)
+
+    choice = {"device": best["device"], "name": best["name"], "samplerate": best["samplerate"],
+              "profiled_at": datetime.now().isoformat(timespec="seconds"), "devices": profiles}
+    with open(DEVICE_CACHE_FILE, "w") as f:
+        json.dump(choice, f, indent=4)
+    print(f"\nBest input: [{best['device']}] {best['name']} at {best['samplerate']} Hz "
+          f"(saved to {DEVICE_CACHE_FILE})")
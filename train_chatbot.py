@@ -1,65 +1,74 @@
-import nltk
-nltk.data.path.append("C:/Users/LENOVO/AppData/Roaming/nltk_data")
+import hashlib
 import json
+import os
 import random
+import time
 import torch
 import torch.nn as nn
 from torch.utils.data import Dataset, DataLoader
-import nltk
-from nltk.stem.porter import PorterStemmer
 import numpy as np
-
-# Download required data
-nltk.download('punkt')
-
-# Helper functions
-stemmer = PorterStemmer()
-
-def tokenize(sentence):
-    return nltk.word_tokenize(sentence)
-
-def stem(word):
-    return stemmer.stem(word.lower())
-
-def bag_of_words(tokenized_sentence, words):
-    sentence_words = [stem(w) for w in tokenized_sentence]
-    bag = np.zeros(len(words), dtype=np.float32)
-    for idx, w in enumerate(words):
-        if w in sentence_words:
-            bag[idx] = 1
-    return bag
-
-# Load intents
-with open("intents.json", "r") as f:
-    intents = json.load(f)
-
-all_words = []
-tags = []
-xy = []
-
-for intent in intents["intents"]:
-    tag = intent["tag"]
-    tags.append(tag)
-    for pattern in intent["patterns"]:
-        w = tokenize(pattern)
-        all_words.extend(w)
-        xy.append((w, tag))
-
-ignore_words = ['?', '!', '.', ',']
-all_words = [stem(w) for w in all_words if w not in ignore_words]
-all_words = sorted(set(all_words))
-tags = sorted(set(tags))
-
-X_train = []
-y_train = []
-
-for (pattern_sentence, tag) in xy:
-    bag = bag_of_words(pattern_sentence, all_words)
-    X_train.append(bag)
-    y_train.append(tags.index(tag))
-
-X_train = np.array(X_train)
-y_train = np.array(y_train)
+import nltk_utils
+from nltk_utils import bag_of_words_batch, make_featurizer, stem, tokenize
+from numpy_model import export_numpy
+
+# Preprocessing
+ignore_words = nltk_utils.IGNORE_WORDS
+CACHE_DIR = "feature_cache"
+
+def build_features(intents):
+    """Tokenizes, stems and featurizes every intent pattern"""
+    all_words = []
+    pattern_words = set()  # lowercased raw tokens, for warming the chatbot's stem cache
+    tags = []
+    xy = []
+
+    for intent in intents["intents"]:
+        tag = intent["tag"]
+        tags.append(tag)
+        for pattern in intent["patterns"]:
+            w = tokenize(pattern)
+            all_words.extend(w)
+            pattern_words.update(word.lower() for word in w)
+            xy.append((w, tag))
+
+    all_words = [stem(w) for w in all_words if w not in ignore_words]
+    all_words = sorted(set(all_words))
+    tags = sorted(set(tags))
+
+    # Featurize every pattern in one pass
+    featurizer = make_featurizer(all_words=all_words)
+    tag_index = {tag: idx for idx, tag in enumerate(tags)}
+    X_train = bag_of_words_batch([pattern_sentence for (pattern_sentence, tag) in xy], featurizer)
+    y_train = np.array([tag_index[tag] for (pattern_sentence, tag) in xy], dtype=np.int64)
+    return all_words, sorted(pattern_words), tags, X_train, y_train
+
+def features_cache_file(intents_bytes):
+    """Cache path keyed by the intents content and every setting that changes the features"""
+    settings = dict(nltk_utils.featurizer_settings(), ignore_words=ignore_words,
+                    cache_format=2)  # bumped when the cached arrays change
+    key = hashlib.sha256(intents_bytes)
+    key.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return os.path.join(CACHE_DIR, f"features-{key.hexdigest()[:16]}.npz")
+
+def load_features(intents_file):
+    """Returns all_words, pattern_words, tags, X_train, y_train, reusing the on-disk cache when intents are unchanged"""
+    with open(intents_file, "rb") as f:
+        intents_bytes = f.read()
+    cache_file = features_cache_file(intents_bytes)
+
+    if os.path.exists(cache_file):
+        with np.load(cache_file, allow_pickle=False) as cached:
+            print(f"Loaded cached features from {cache_file}")
+            return (cached["all_words"].tolist(), cached["pattern_words"].tolist(), cached["tags"].tolist(),
+                    cached["X_train"], cached["y_train"])
+
+    all_words, pattern_words, tags, X_train, y_train = build_features(json.loads(intents_bytes))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    np.savez(cache_file, all_words=np.array(all_words, dtype=str), pattern_words=np.array(pattern_words, dtype=str),
+             tags=np.array(tags, dtype=str), X_train=X_train, y_train=y_train)
+    return all_words, pattern_words, tags, X_train, y_train
+
+all_words, pattern_words, tags, X_train, y_train = load_features("intents.json")
 
 # Neural Net Model
 class ChatDataset(Dataset):
@@ -91,38 +100,120 @@ class NeuralNet(nn.Module):
         return out
 
 # Training
-batch_size = 8
+train_mode = "tensor"  # "tensor": whole dataset kept as one tensor, "loader": DataLoader batches
+batch_size = 8  # loader mode
+tensor_batch_size = 0  # tensor mode, 0 = full batch
 hidden_size = 8
 output_size = len(tags)
-input_size = len(all_words)
+input_size = X_train.shape[1]  # len(all_words), or the bucket count when hashed
 learning_rate = 0.001
+tensor_learning_rate = 0.01  # full batches take far fewer optimizer steps per epoch
 num_epochs = 1000
 
-dataset = ChatDataset()
-train_loader = DataLoader(dataset=dataset, batch_size=batch_size, shuffle=True)
+# Early stopping (tensor mode): stop when the monitored value hasn't improved for `patience` epochs.
+# With val_fraction > 0 a share of the patterns is held out and validation accuracy is monitored,
+# otherwise the training loss is.
+patience = 50
+min_delta = 1e-3
+val_fraction = 0.0
 
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 model = NeuralNet(input_size, hidden_size, output_size).to(device)
 
 criterion = nn.CrossEntropyLoss()
-optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
-
-for epoch in range(num_epochs):
-    for (words, labels) in train_loader:
-        words = words.to(device)
-        labels = labels.to(dtype=torch.long).to(device)
 
-        outputs = model(words)
-        loss = criterion(outputs, labels)
-
-        optimizer.zero_grad()
-        loss.backward()
-        optimizer.step()
-
-    if (epoch+1) % 100 == 0:
-        print(f'Epoch [{epoch+1}/{num_epochs}], Loss: {loss.item():.4f}')
-
-print(f'Final loss: {loss.item():.4f}')
+def train_with_loader():
+    """Original mini-batch loop over a DataLoader"""
+    dataset = ChatDataset()
+    train_loader = DataLoader(dataset=dataset, batch_size=batch_size, shuffle=True)
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+
+    for epoch in range(num_epochs):
+        for (words, labels) in train_loader:
+            words = words.to(device)
+            labels = labels.to(dtype=torch.long).to(device)
+
+            outputs = model(words)
+            loss = criterion(outputs, labels)
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+
+        if (epoch+1) % 100 == 0:
+            print(f'Epoch [{epoch+1}/{num_epochs}], Loss: {loss.item():.4f}')
+
+    return loss.item(), num_epochs
+
+def train_with_tensors():
+    """Whole dataset as one tensor on the device, tensor-level shuffling, early stopping"""
+    X = torch.from_numpy(X_train).to(device)
+    y = torch.from_numpy(y_train).to(dtype=torch.long, device=device)
+
+    # Optional validation split
+    n_val = int(len(X) * val_fraction)
+    if n_val:
+        perm = torch.randperm(len(X), device=device)
+        X_val, y_val = X[perm[:n_val]], y[perm[:n_val]]
+        X, y = X[perm[n_val:]], y[perm[n_val:]]
+
+    n_samples = len(X)
+    step = tensor_batch_size or n_samples
+    optimizer = torch.optim.Adam(model.parameters(), lr=tensor_learning_rate)
+
+    best = None
+    best_state = None
+    stale_epochs = 0
+    for epoch in range(num_epochs):
+        perm = torch.randperm(n_samples, device=device)
+        total_loss = 0.0
+        for start in range(0, n_samples, step):
+            idx = perm[start:start + step]
+            outputs = model(X[idx])
+            loss = criterion(outputs, y[idx])
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(idx)
+        # Mean over the epoch: with mini-batches the last batch's loss alone is too noisy to stop on
+        epoch_loss = total_loss / n_samples
+
+        # Higher is better for validation accuracy, so track it negated like a loss
+        if n_val:
+            with torch.no_grad():
+                monitored = -(model(X_val).argmax(dim=1) == y_val).float().mean().item()
+        else:
+            monitored = epoch_loss
+
+        if best is None or monitored < best - min_delta:
+            best = monitored
+            best_state = {k: v.clone() for k, v in model.state_dict().items()}
+            stale_epochs = 0
+        else:
+            stale_epochs += 1
+
+        if (epoch+1) % 100 == 0:
+            print(f'Epoch [{epoch+1}/{num_epochs}], Loss: {epoch_loss:.4f}')
+
+        if stale_epochs >= patience:
+            print(f'Early stopping at epoch {epoch+1}: no improvement for {patience} epochs')
+            break
+
+    # Report the training loss of the weights kept, not of the last epoch
+    model.load_state_dict(best_state)
+    with torch.no_grad():
+        return criterion(model(X), y).item(), epoch + 1
+
+start_time = time.perf_counter()
+if train_mode == "loader":
+    final_loss, epochs_run = train_with_loader()
+else:
+    final_loss, epochs_run = train_with_tensors()
+elapsed = time.perf_counter() - start_time
+
+print(f'Final loss: {final_loss:.4f}')
+print(f'Trained {epochs_run} epochs in {elapsed:.2f}s ({epochs_run / elapsed:.0f} epochs/sec)')
 
 # Save model
 data = {
@@ -131,9 +222,15 @@ data = {
     "hidden_size": hidden_size,
     "output_size": output_size,
     "all_words": all_words,
-    "tags": tags
+    "pattern_words": pattern_words,
+    "tags": tags,
+    "tokenizer": nltk_utils.TOKENIZER,
+    "featurizer": make_featurizer(all_words=all_words).settings()
 }
 
 FILE = "data.pth"
 torch.save(data, FILE)
 print(f'Training complete. File saved to {FILE}')
+
+# Keep the torch-free copy used by chat.py in sync
+print(f'NumPy weights exported to {export_numpy(FILE)}')
@@ -0,0 +1,309 @@
+# tts.py
+# Text-to-speech on a worker thread: the pyttsx3 engine is created and driven by one thread
+# that speaks queued utterances in priority order, so speak() never blocks the caller.
+# Each utterance is spoken sentence by sentence: the first chunk starts playing while the
+# rest are still to be synthesized or read from the cache.
+
+import collections
+import itertools
+import os
+import queue
+import re
+import threading
+import time
+
+from pipeline import StageStats
+
+URGENT, NORMAL, LOW = 0, 1, 2
+
+# Sentence ends (punctuation followed by whitespace) and line breaks; "22.5" stays whole
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+
+def split_sentences(text):
+    """The chunks text is spoken in"""
+    return [chunk.strip() for chunk in _SENTENCE_RE.split(text) if chunk.strip()]
+
+class Utterance:
+    """Handle for one queued piece of text (spoken as one or more chunks): wait() for it, or cancel() it"""
+    def __init__(self, text, priority, chunks=None):
+        self.text = text
+        self.priority = priority
+        self.chunks = chunks or [text]
+        self.queued_at = time.perf_counter()
+        self.first_audio_at = None
+        self.started_at = None
+        self.finished_at = None
+        self.cancelled = False
+        self.done = threading.Event()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+class SpeechWorker:
+    """
+    Owns the pyttsx3 engine (created on the worker thread: engines must be driven from the
+    thread that made them) and a bounded priority queue of Utterances. say() returns at once;
+    a full queue drops the new utterance (counted). Cancelling the utterance being spoken stops
+    the engine at the next word boundary. speaking is set while audio plays, last_spoke_at is
+    when the last utterance ended (time.monotonic), for echo handling on the capture side.
+    With a tts_cache.SpeechCache, static phrases are played from pre-rendered files; missing
+    ones are spoken live this time and rendered while the worker has nothing else to do.
+    With stream, text is split into sentences; time to first audio (queued -> first chunk
+    audible) is tracked next to the queue wait and total speaking time.
+    """
+    def __init__(self, rate=150, volume=1.0, maxsize=8, cache=None, stream=True):
+        self.rate = rate
+        self.volume = volume
+        self.voice = None
+        self.cache = cache
+        self.to_render = collections.deque()
+        self.preloaded = {}  # cached file -> audio, read while the chunk before it plays
+        self.stream = stream
+        self.queue = queue.PriorityQueue(maxsize)
+        self.order = itertools.count()  # FIFO within a priority
+        self.current = None
+        self.speaking = threading.Event()
+        self.last_spoke_at = 0.0
+        self.idle = threading.Condition()
+        self.pending = 0
+        self.thread = None
+        self.engine = None
+        self.output = None  # the worker's own sd.OutputStream for cached audio, and its (rate, channels)
+        self.output_format = None
+        self.startup_seconds = None  # time to load and initialize the engine
+        self.ready = threading.Event()
+        self.wait_stats = StageStats()
+        self.speak_stats = StageStats()
+        self.first_audio_stats = StageStats()
+        self.dropped = 0
+        self.cancelled = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="tts", daemon=True)
+            self.thread.start()
+        return self
+
+    def _make_engine(self):
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        engine.setProperty('rate', self.rate)
+        engine.setProperty('volume', self.volume)
+        self.voice = engine.getProperty('voice')
+        if hasattr(engine, "connect"):
+            engine.connect('started-word', self._on_word)
+            engine.connect('started-utterance', self._on_utterance_start)
+        return engine
+
+    def _on_utterance_start(self, name):
+        if self.current is not None:
+            self._mark_first_audio(self.current)
+
+    def _mark_first_audio(self, utterance, at=None):
+        if utterance.first_audio_at is None:
+            utterance.first_audio_at = at or time.perf_counter()
+            self.first_audio_stats.record(utterance.first_audio_at - utterance.queued_at)
+
+    def _on_word(self, name, location, length):
+        # Runs on the worker thread inside runAndWait, where stopping the engine is safe
+        if self.current is not None and self.current.cancelled:
+            self.engine.stop()
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self.engine = self._make_engine()
+            self.startup_seconds = time.perf_counter() - start
+        except Exception as e:
+            print(f"Speech engine error: {e}")
+        self.ready.set()
+        while True:
+            try:
+                # Don't wait while there are phrases to render; poll so new ones are noticed
+                block = not self.to_render
+                _, _, utterance = self.queue.get(block, timeout=0.2 if self.cache is not None else None)
+            except queue.Empty:
+                if self.to_render:
+                    self._render_next()
+                continue
+            if utterance is None:
+                self._close_output()
+                return
+            if not utterance.cancelled and self.engine is not None:
+                self._speak(utterance)
+            if utterance.cancelled:
+                self.cancelled += 1
+            utterance.done.set()
+            with self.idle:
+                self.pending -= 1
+                self.idle.notify_all()
+
+    def _cache_key(self):
+        return self.voice, self.rate, self.volume
+
+    def _render_next(self):
+        """Renders one queued static phrase into the cache (only when nothing is waiting to be said)"""
+        text = self.to_render.popleft()
+        if self.engine is None or os.path.exists(self.cache.path(text, *self._cache_key())):
+            return
+        try:
+            self.cache.render(self.engine, text, *self._cache_key())
+        except Exception as e:
+            print(f"Speech cache error: {e}")
+
+    def _plan(self, chunks):
+        """[(chunk, cached file or None)]; static chunks that aren't cached yet are queued for rendering"""
+        plan = []
+        for chunk in chunks:
+            path = None
+            if self.cache is not None and self.cache.cacheable(chunk):
+                path = self.cache.get(chunk, *self._cache_key())
+                if path is None:
+                    self.to_render.append(chunk)
+            plan.append((chunk, path))
+        return plan
+
+    def _output(self, sample_rate, channels):
+        """
+        Output stream owned by the worker: sd.play()/sd.stop() share one global stream with
+        sd.rec(), so playing through them would cut off (or be cut off by) a recording
+        """
+        import sounddevice as sd
+
+        if self.output is None or self.output_format != (sample_rate, channels):
+            self._close_output()
+            self.output = sd.OutputStream(samplerate=sample_rate, channels=channels, dtype='int16')
+            self.output.start()
+            self.output_format = (sample_rate, channels)
+        return self.output
+
+    def _close_output(self):
+        if self.output is not None:
+            self.output.abort()  # drops whatever is still buffered
+            self.output.close()
+            self.output = None
+
+    def _play(self, path, next_path, utterance):
+        """
+        Plays a cached file in 20 ms blocks, stopping early if the utterance is cancelled;
+        the next chunk's file is read meanwhile so it can start right after this one
+        """
+        samples, sample_rate = self.preloaded.pop(path, None) or self.cache.load(path)
+        samples = samples.reshape(len(samples), -1)
+        output = self._output(sample_rate, samples.shape[1])
+        block = sample_rate // 50
+        self._mark_first_audio(utterance)
+        for start in range(0, len(samples), block):
+            if utterance.cancelled:
+                self._close_output()
+                return
+            output.write(samples[start:start + block])  # blocks while the device buffer is full
+            if next_path is not None and next_path not in self.preloaded:
+                self.preloaded[next_path] = self.cache.load(next_path)
+        time.sleep(output.latency)  # the last blocks are still in the device buffer
+
+    def _say_live(self, chunks, utterance):
+        """Consecutive uncached chunks in one engine run: the engine speaks them back to back"""
+        for chunk in chunks:
+            self.engine.say(chunk)
+        before = time.perf_counter()
+        self.engine.runAndWait()
+        # Drivers without the started-utterance callback: count from when the engine was started
+        self._mark_first_audio(utterance, before)
+
+    def _speak(self, utterance):
+        self.current = utterance
+        utterance.started_at = time.perf_counter()
+        self.wait_stats.record(utterance.started_at - utterance.queued_at)
+        plan = self._plan(utterance.chunks)
+        self.speaking.set()
+        try:
+            i = 0
+            while i < len(plan) and not utterance.cancelled:
+                chunk, path = plan[i]
+                if path is None:
+                    end = i
+                    while end < len(plan) and plan[end][1] is None:
+                        end += 1
+                    self._say_live([c for c, _ in plan[i:end]], utterance)
+                    i = end
+                    continue
+                try:
+                    self._play(path, plan[i + 1][1] if i + 1 < len(plan) else None, utterance)
+                except Exception as e:
+                    print(f"Cached speech error: {e}")
+                    self._say_live([chunk], utterance)
+                i += 1
+        except Exception as e:
+            print(f"Speech error: {e}")
+        finally:
+            self.preloaded.clear()
+            self.last_spoke_at = time.monotonic()
+            self.speaking.clear()
+            self.current = None
+        utterance.finished_at = time.perf_counter()
+        self.speak_stats.record(utterance.finished_at - utterance.started_at)
+
+    def prerender(self, texts):
+        """Registers static phrases with the cache and renders the missing ones in idle time"""
+        if self.cache is None:
+            return
+        texts = list(dict.fromkeys(texts))
+        self.cache.register(texts)
+        self.to_render.extend(texts)
+
+    def say(self, text, priority=NORMAL, interrupt=False):
+        """Queues text and returns its Utterance; interrupt cancels everything queued or playing first"""
+        if interrupt:
+            self.cancel()
+        utterance = Utterance(text, priority, split_sentences(text) if self.stream else None)
+        with self.idle:
+            self.pending += 1
+        try:
+            self.queue.put_nowait((priority, next(self.order), utterance))
+        except queue.Full:
+            self.dropped += 1
+            utterance.cancel()
+            utterance.done.set()
+            with self.idle:
+                self.pending -= 1
+                self.idle.notify_all()
+        return utterance
+
+    def cancel(self):
+        """Cancels the utterance being spoken and everything still queued"""
+        with self.queue.mutex:
+            for _, _, utterance in self.queue.queue:
+                if utterance is not None:
+                    utterance.cancel()
+        current = self.current
+        if current is not None:
+            current.cancel()
+
+    def wait(self, timeout=None):
+        """Blocks until everything queued so far has been spoken (or cancelled)"""
+        with self.idle:
+            return self.idle.wait_for(lambda: self.pending == 0, timeout=timeout)
+
+    def stop(self, timeout=None):
+        """Cancels what is left and ends the worker thread"""
+        self.cancel()
+        if self.thread is not None:
+            self.queue.put((float("inf"), next(self.order), None))
+            self.thread.join(timeout)
+            self.thread = None
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "dropped": self.dropped,
+            "cancelled": self.cancelled,
+            "wait": self.wait_stats.snapshot(),
+            "speak": self.speak_stats.snapshot(),
+            "first_audio": self.first_audio_stats.snapshot(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
@@ -0,0 +1,84 @@
+# tts_cache.py
+# On-disk cache of pre-rendered speech for the bot's fixed phrases, so they are played
+# straight from a WAV file instead of being synthesized again on every turn
+
+import hashlib
+import os
+
+class SpeechCache:
+    """
+    Audio files rendered with pyttsx3's save_to_file, one per phrase, named by a hash of
+    (text, voice, rate, volume) so changing the voice settings never plays stale audio.
+    Only registered static phrases are cached; the least recently played files are
+    deleted once the directory grows past max_bytes.
+    """
+    def __init__(self, directory="tts_cache", max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.static = set()
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def register(self, texts):
+        """Marks phrases as static (worth caching)"""
+        self.static.update(texts)
+
+    def cacheable(self, text):
+        return text in self.static
+
+    def path(self, text, voice, rate, volume):
+        key = hashlib.sha1(f"{text}\0{voice}\0{rate}\0{volume}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def get(self, text, voice, rate, volume):
+        """Path of the cached audio (marked as just used), or None"""
+        path = self.path(text, voice, rate, volume)
+        if os.path.exists(path):
+            os.utime(path)
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def render(self, engine, text, voice, rate, volume):
+        """Synthesizes text to its cache file; must run on the thread that owns the engine"""
+        path = self.path(text, voice, rate, volume)
+        partial = path + ".part.wav"
+        engine.save_to_file(text, partial)
+        engine.runAndWait()
+        if not os.path.exists(partial) or os.path.getsize(partial) == 0:
+            raise RuntimeError(f"Speech engine wrote no audio for {text!r}")
+        os.replace(partial, path)
+        self.renders += 1
+        self.evict()
+        return path
+
+    def evict(self):
+        """Deletes least recently used files until the cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".wav") and not name.endswith(".part.wav"):
+                st = os.stat(path)
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    @staticmethod
+    def load(path):
+        """(int16 samples, sample rate); soundfile also reads the AIFF some drivers write"""
+        import soundfile as sf
+
+        return sf.read(path, dtype='int16')
+
+    def stats(self):
+        files = [n for n in os.listdir(self.directory) if n.endswith(".wav") and not n.endswith(".part.wav")]
+        size = sum(os.path.getsize(os.path.join(self.directory, n)) for n in files)
+        return {"hits": self.hits, "misses": self.misses, "renders": self.renders,
+                "files": len(files), "bytes": size}
@@ -0,0 +1,330 @@
+# vad.py
+# Energy / zero-crossing voice activity detection and streaming endpointing
+
+import numpy as np
+
+FULL_SCALE = 32768.0  # int16
+
+def frame_features(frames):
+    """
+    frames: (n_frames, frame_len) int16 or float array
+    returns (energy in dBFS, zero-crossing rate) per frame, computed for all frames at once
+    """
+    x = np.asarray(frames, dtype=np.float32) / FULL_SCALE
+    rms = np.sqrt(np.mean(x * x, axis=1))
+    energy_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+    signs = np.signbit(x)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (x.shape[1] - 1)
+    return energy_db, zcr
+
+def speech_frames(frames, threshold_db=-45.0, zcr_max=0.35):
+    """Boolean speech mask per frame: loud enough and not hiss-like (very high zero-crossing rate)"""
+    energy_db, zcr = frame_features(frames)
+    return (energy_db > threshold_db) & (zcr < zcr_max)
+
+def trim_silence(samples, sample_rate=16000, threshold_db=-45.0, frame_ms=30, keep_ms=150,
+                 max_pause_ms=None, zcr_max=0.35):
+    """
+    Cuts leading and trailing silence (keeping keep_ms around the speech) and, with max_pause_ms,
+    shortens internal pauses to at most that long. Decided per frame for the whole utterance at
+    once; returns the kept samples (empty if no speech frame was found).
+    """
+    samples = np.asarray(samples, dtype=np.int16).reshape(-1)
+    frame_len = int(sample_rate * frame_ms / 1000)
+    n_frames = len(samples) // frame_len
+    if not n_frames:
+        return samples[:0]
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    speech = np.flatnonzero(speech_frames(frames, threshold_db, zcr_max))
+    if not len(speech):
+        return samples[:0]
+
+    # Distance (in frames) from every frame to the nearest speech frame
+    idx = np.arange(n_frames)
+    right = np.minimum(np.searchsorted(speech, idx), len(speech) - 1)
+    left = np.maximum(right - 1, 0)
+    distance = np.minimum(np.abs(speech[right] - idx), np.abs(speech[left] - idx))
+
+    keep_frames = int(keep_ms / frame_ms)
+    inside = (idx > speech[0]) & (idx < speech[-1])
+    if max_pause_ms is None:
+        keep = inside | (distance <= keep_frames)
+    else:
+        # A pause keeps half of max_pause_ms on each side of it, whatever keep_ms is
+        pause_frames = int(max_pause_ms / frame_ms) // 2
+        keep = distance <= np.where(inside, pause_frames, keep_frames)
+    return frames[keep].reshape(-1)
+
+class Endpointer:
+    """
+    Streaming endpoint detection on int16 blocks of any size.
+    Speech starts after `start_frames` consecutive speech frames and ends after `hangover_ms`
+    of silence or at `max_length_s`. The `pre_roll_ms` before the detected start is kept so
+    the first syllable is not clipped. The threshold follows the noise floor measured while idle.
+    """
+    IDLE, SPEECH, DONE = "idle", "speech", "done"
+
+    def __init__(self, sample_rate=16000, frame_ms=30, pre_roll_ms=300, hangover_ms=700,
+                 max_length_s=10.0, threshold_db=-45.0, noise_margin_db=10.0, zcr_max=0.35,
+                 start_frames=3, keep_audio=True):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.max_frames = int(max_length_s * 1000 / frame_ms)
+        self.min_threshold_db = threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.zcr_max = zcr_max
+        self.start_frames = start_frames
+        self.keep_audio = keep_audio
+        self.noise_floor_db = None
+
+        # Preallocated buffers: pre-roll ring of frames (also holding the start frames),
+        # partial frame, utterance (pre-roll + max length)
+        self.pre_roll_frames = int(pre_roll_ms / frame_ms) + start_frames
+        self._pre_roll = np.zeros((self.pre_roll_frames, self.frame_len), dtype=np.int16)
+        self._partial = np.zeros(self.frame_len, dtype=np.int16)
+        n_samples = (self.pre_roll_frames + self.max_frames) * self.frame_len if keep_audio else 0
+        self._utterance = np.zeros(n_samples, dtype=np.int16)
+        self.reset()
+
+    def reset(self):
+        """Forget the current utterance (the noise floor estimate is kept)"""
+        self.state = self.IDLE
+        self.truncated = False
+        self._pre_roll_count = 0
+        self._frames_seen = 0
+        self.utterance_start = None
+        self.utterance_end = None
+        self._n_partial = 0
+        self._n_samples = 0
+        self._speech_run = 0
+        self._silence_run = 0
+        self._speech_frames = 0
+
+    def calibrate(self, samples):
+        """Sets the noise floor from ambient audio (median frame energy); idle frames keep updating it"""
+        n_frames = len(samples) // self.frame_len
+        if n_frames:
+            frames = np.asarray(samples[:n_frames * self.frame_len]).reshape(n_frames, self.frame_len)
+            energy_db, _ = frame_features(frames)
+            self.noise_floor_db = float(np.median(energy_db))
+        return self.noise_floor_db
+
+    @property
+    def threshold_db(self):
+        if self.noise_floor_db is None:
+            return self.min_threshold_db
+        return max(self.min_threshold_db, self.noise_floor_db + self.noise_margin_db)
+
+    def process(self, block):
+        """Feeds a 1-D int16 block, returns the state after it ("idle", "speech" or "done")"""
+        block = np.asarray(block, dtype=np.int16).reshape(-1)
+        if self.state == self.DONE or not len(block):
+            return self.state
+
+        # Complete the partial frame left over from the previous block
+        if self._n_partial:
+            take = min(self.frame_len - self._n_partial, len(block))
+            self._partial[self._n_partial:self._n_partial + take] = block[:take]
+            self._n_partial += take
+            block = block[take:]
+            if self._n_partial == self.frame_len:
+                self._n_partial = 0
+                self._process_frames(self._partial[np.newaxis, :])
+
+        n_frames = len(block) // self.frame_len
+        if n_frames and self.state != self.DONE:
+            self._process_frames(block[:n_frames * self.frame_len].reshape(n_frames, self.frame_len))
+
+        rest = block[n_frames * self.frame_len:]
+        if len(rest) and self.state != self.DONE:
+            self._partial[:len(rest)] = rest
+            self._n_partial = len(rest)
+        return self.state
+
+    def _process_frames(self, frames):
+        energy_db, zcr = frame_features(frames)
+        for frame, frame_db, frame_zcr in zip(frames, energy_db, zcr):
+            is_speech = frame_db > self.threshold_db and frame_zcr < self.zcr_max
+            self._frames_seen += 1
+            if self.state == self.IDLE:
+                self._idle_frame(frame, frame_db, is_speech)
+            else:
+                self._speech_frame(frame, is_speech)
+            if self.state == self.DONE:
+                self.utterance_end = self._frames_seen * self.frame_len
+                break
+
+    def _idle_frame(self, frame, frame_db, is_speech):
+        self._pre_roll[self._pre_roll_count % self.pre_roll_frames] = frame
+        self._pre_roll_count += 1
+        if not is_speech:
+            self._speech_run = 0
+            # Slow-moving noise floor estimate from non-speech frames
+            if self.noise_floor_db is None:
+                self.noise_floor_db = frame_db
+            else:
+                self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * frame_db
+            return
+        self._speech_run += 1
+        if self._speech_run >= self.start_frames:
+            self.state = self.SPEECH
+            # Oldest to newest frame of the pre-roll ring
+            count = min(self._pre_roll_count, self.pre_roll_frames)
+            self.utterance_start = (self._frames_seen - count) * self.frame_len
+            for i in range(self._pre_roll_count - count, self._pre_roll_count):
+                self._append(self._pre_roll[i % self.pre_roll_frames])
+            self._pre_roll_count = 0
+
+    def _speech_frame(self, frame, is_speech):
+        self._append(frame)
+        self._speech_frames += 1
+        self._silence_run = 0 if is_speech else self._silence_run + 1
+        if self._silence_run >= self.hangover_frames:
+            self.state = self.DONE
+        elif self._speech_frames >= self.max_frames:
+            self.state = self.DONE
+            self.truncated = True
+
+    def _append(self, frame):
+        if not self.keep_audio:
+            return
+        self._utterance[self._n_samples:self._n_samples + len(frame)] = frame
+        self._n_samples += len(frame)
+
+    def utterance(self):
+        """Samples captured so far (pre-roll + speech + hangover), as a view into the preallocated buffer (empty if keep_audio=False)"""
+        return self._utterance[:self._n_samples]
+
+class BargeInDetector:
+    """
+    Spots the user talking over the bot's own speech, fed with the microphone while the bot plays.
+    Basic echo suppression: the loudspeaker echo sets the bar, as the echo_percentile of frame
+    energies over the last window_ms, and user speech has to beat it by margin_db (and the noise
+    threshold) for min_speech_ms in a row. The grace period starts at the first audible frame,
+    not at reset(): engine start-up or leading silence in a cached file can delay the real audio,
+    and nothing fires during the first grace_ms of it while the echo estimate is built from it
+    alone. Every frame above the bar raises the estimate by echo_rise_db (echo frames let it
+    fall back), so echo that gets louder later lifts the bar instead of firing.
+    """
+    def __init__(self, sample_rate=16000, frame_ms=30, window_ms=1000, margin_db=8.0, min_speech_ms=240,
+                 grace_ms=300, echo_percentile=75, echo_rise_db=0.25, zcr_max=0.35):
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.window = np.zeros(max(1, int(window_ms / frame_ms)), dtype=np.float32)
+        self.margin_db = margin_db
+        self.min_frames = max(1, int(min_speech_ms / frame_ms))
+        self.grace_frames = int(grace_ms / frame_ms)
+        self.echo_percentile = echo_percentile
+        self.echo_rise_db = echo_rise_db
+        self.zcr_max = zcr_max
+        self._partial = np.zeros(self.frame_len, dtype=np.int16)
+        self.reset()
+
+    def reset(self, threshold_db=-45.0):
+        """New playback; threshold_db is the ordinary speech threshold (e.g. Endpointer.threshold_db)"""
+        self.threshold_db = threshold_db
+        self._frames = 0
+        self._audible_frames = 0  # frames since the first audible one
+        self._echo_frames = 0
+        self._rise_db = 0.0
+        self._n_partial = 0
+        self._speech_run = 0
+        self.playback_start = None  # samples since reset() where audio was first heard
+        self.onset = None  # samples since reset() where the interrupting speech began
+
+    @property
+    def echo_db(self):
+        n = min(self._echo_frames, len(self.window))
+        if not n:
+            return -100.0
+        return float(np.percentile(self.window[:n], self.echo_percentile)) + self._rise_db
+
+    def process(self, block):
+        """Feeds a 1-D int16 block, returns True once the user is talking over the bot"""
+        block = np.asarray(block, dtype=np.int16).reshape(-1)
+        if self._n_partial:
+            take = min(self.frame_len - self._n_partial, len(block))
+            self._partial[self._n_partial:self._n_partial + take] = block[:take]
+            self._n_partial += take
+            block = block[take:]
+            if self._n_partial == self.frame_len:
+                self._n_partial = 0
+                if self._process_frames(self._partial[np.newaxis, :]):
+                    return True
+        n_frames = len(block) // self.frame_len
+        detected = n_frames and self._process_frames(block[:n_frames * self.frame_len].reshape(n_frames, self.frame_len))
+        rest = block[n_frames * self.frame_len:]
+        self._partial[:len(rest)] = rest
+        self._n_partial = len(rest)
+        return bool(detected)
+
+    def _process_frames(self, frames):
+        energy_db, zcr = frame_features(frames)
+        for frame_db, frame_zcr in zip(energy_db, zcr):
+            self._frames += 1
+            if not self._audible_frames and frame_db <= self.threshold_db:
+                continue  # nothing audible yet: the bot hasn't really started
+            if not self._audible_frames:
+                self.playback_start = (self._frames - 1) * self.frame_len
+            self._audible_frames += 1
+            bar = max(self.threshold_db, self.echo_db + self.margin_db)
+            is_speech = (self._audible_frames > self.grace_frames and frame_db > bar
+                         and frame_zcr < self.zcr_max)
+            self._speech_run = self._speech_run + 1 if is_speech else 0
+            if is_speech:
+                self._rise_db += self.echo_rise_db
+            else:
+                self._rise_db = max(0.0, self._rise_db - self.echo_rise_db)
+                self.window[self._echo_frames % len(self.window)] = frame_db
+                self._echo_frames += 1
+            if self._speech_run >= self.min_frames:
+                self.onset = (self._frames - self._speech_run) * self.frame_len
+                return True
+        return False
+
+def check_barge_in(sample_rate=16000, seconds=6.0, seeds=range(5)):
+    """
+    Synthetic checks for BargeInDetector: bot echo alone, starting after leading silence of
+    various lengths, must never fire; the user talking over it must. Raises AssertionError.
+    """
+    n = int(seconds * sample_rate)
+    rng = None
+
+    def echo(lead_s):
+        """Syllable-like bursts of varying loudness with short gaps, after lead_s of silence"""
+        out = np.zeros(n)
+        pos = int(lead_s * sample_rate)
+        while pos < n:
+            length = int(rng.uniform(0.12, 0.3) * sample_rate)
+            t = np.arange(min(length, n - pos)) / sample_rate
+            f0 = rng.uniform(150, 350)
+            burst = np.sin(2 * np.pi * f0 * t) + 0.4 * np.sin(2 * np.pi * 2 * f0 * t)
+            out[pos:pos + len(t)] = rng.uniform(800, 2500) * burst * np.hanning(len(t))
+            pos += length + int(rng.uniform(0.03, 0.15) * sample_rate)
+        return out
+
+    def run(signal):
+        detector = BargeInDetector(sample_rate)
+        detector.reset(-45.0)
+        samples = np.clip(signal + rng.normal(0, 30, n), -32768, 32767).astype(np.int16)
+        for start in range(0, n, 480):
+            if detector.process(samples[start:start + 480]):
+                return detector.onset / sample_rate
+        return None
+
+    t = np.arange(n) / sample_rate
+    # User close to the microphone, about 12 dB over the loudest echo, from 3 s on
+    user = np.where(t > 3.0, 10000 * np.sin(2 * np.pi * 180 * t) * (0.75 + 0.25 * np.sin(2 * np.pi * 4 * t)), 0)
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        for lead_s in (0.0, 0.2, 0.4, 0.6, 1.0):
+            fired = run(echo(lead_s))
+            assert fired is None, f"echo only, {lead_s:.1f} s lead (seed {seed}): fired at {fired:.2f} s"
+        for lead_s in (0.0, 0.6):
+            onset = run(echo(lead_s) + user)
+            assert onset is not None and 2.9 < onset < 3.4, \
+                f"user over echo, {lead_s:.1f} s lead (seed {seed}): onset {onset}"
+    print(f"barge-in checks passed ({len(seeds)} seeds)")
+
+if __name__ == "__main__":
+    check_barge_in()
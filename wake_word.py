@@ -0,0 +1,214 @@
+# wake_word.py
+# Lightweight wake-word spotting: log-mel features + subsequence DTW against a few
+# recorded examples of the bot name, so only audio after the wake phrase is sent to
+# full speech recognition.
+#
+#   python wake_word.py enroll              record examples into wake_word/
+#   python wake_word.py eval POS_DIR NEG_DIR  detection / false-accept rate and CPU use on WAV fixtures
+
+import glob
+import json
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+WIN = 400  # 25 ms
+HOP = 160  # 10 ms
+N_FFT = 512
+N_MELS = 26
+
+def _mel_filterbank(n_mels=N_MELS, n_fft=N_FFT, sample_rate=SAMPLE_RATE, fmin=80.0, fmax=7600.0):
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mels = np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mels) / sample_rate).astype(int)
+    bank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        bank[m - 1, left:center] = (np.arange(left, center) - left) / max(center - left, 1)
+        bank[m - 1, center:right] = (right - np.arange(center, right)) / max(right - center, 1)
+    return bank
+
+MEL_BANK = _mel_filterbank()
+WINDOW = np.hanning(WIN).astype(np.float32)
+
+def log_mel(samples):
+    """(n_frames, N_MELS) mean-normalized log-mel features with unit-length rows"""
+    x = np.asarray(samples, dtype=np.float32) / 32768.0
+    if len(x) < WIN:
+        return np.zeros((0, N_MELS), dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(x, WIN)[::HOP] * WINDOW
+    power = np.abs(np.fft.rfft(frames, n=N_FFT)) ** 2
+    features = np.log(power @ MEL_BANK.T + 1e-10)
+    features -= features.mean(axis=0)
+    features /= np.linalg.norm(features, axis=1, keepdims=True) + 1e-10
+    return features
+
+def subsequence_dtw(template, features):
+    """
+    Best match of the template anywhere inside features (free start and end).
+    Steps (1,1), (1,2), (2,1) only look at the previous two columns, so every column is one
+    vectorized update over the template frames. Returns (score, end frame); score is the
+    average cosine distance per template frame (0 = identical), inf if features are too short.
+    """
+    n, m = len(template), len(features)
+    if n < 2 or m < 1:
+        return np.inf, 0
+    cost = 1.0 - template @ features.T
+    prev1 = np.full(n, np.inf)  # column j-1
+    prev2 = np.full(n, np.inf)  # column j-2
+    last = np.empty(m)
+    for j in range(m):
+        col = np.empty(n)
+        col[0] = cost[0, j]
+        diagonal = prev1[:-1]
+        skip_audio = prev2[:-1]
+        skip_template = np.full(n - 1, np.inf)
+        skip_template[1:] = prev1[:-2] + cost[1:-1, j]
+        col[1:] = cost[1:, j] + np.minimum(np.minimum(diagonal, skip_audio), skip_template)
+        last[j] = col[-1]
+        prev2, prev1 = prev1, col
+    end = int(np.argmin(last))
+    return last[end] / n, end
+
+def read_wav(path):
+    """
+    Mono int16 samples at SAMPLE_RATE (other rates are linearly resampled); 8, 24 and 32-bit
+    PCM is reduced to 16 bits, any other sample width raises ValueError
+    """
+    with wave.open(path, "rb") as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        raw = f.readframes(f.getnframes())
+    if width == 1:  # unsigned, centred on 128
+        data = ((np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8).astype(np.int16)
+    elif width == 2:
+        data = np.frombuffer(raw, dtype=np.int16)
+    elif width == 3:  # little-endian 24-bit: keep the two high bytes
+        data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)[:, 1:].copy().view("<i2")[:, 0]
+    elif width == 4:
+        data = (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+    else:
+        raise ValueError(f"{path}: unsupported sample width of {width} bytes")
+    if channels > 1:
+        data = data.reshape(-1, channels)[:, 0]
+    if rate != SAMPLE_RATE:
+        positions = np.arange(int(len(data) * SAMPLE_RATE / rate)) * rate / SAMPLE_RATE
+        data = np.interp(positions, np.arange(len(data)), data).astype(np.int16)
+    return data
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+
+class WakeWordDetector:
+    """Matches utterances against the enrolled example recordings of the wake phrase"""
+    def __init__(self, templates, threshold=0.35):
+        self.templates = [log_mel(t) for t in templates]
+        self.threshold = threshold
+
+    @classmethod
+    def from_dir(cls, templates_dir, threshold=0.35):
+        paths = sorted(glob.glob(os.path.join(templates_dir, "*.wav")))
+        if not paths:
+            raise FileNotFoundError(f"No wake word examples in {templates_dir}/ (run: python wake_word.py enroll)")
+        return cls([read_wav(p) for p in paths], threshold)
+
+    def find(self, samples):
+        """
+        Returns (detected, end sample, score): end is where the wake phrase ends in samples,
+        so everything after it is the actual command
+        """
+        features = log_mel(samples)
+        best_score, best_end = np.inf, 0
+        for template in self.templates:
+            score, end = subsequence_dtw(template, features)
+            if score < best_score:
+                best_score, best_end = score, end
+        end_sample = min(len(samples), best_end * HOP + WIN)
+        return bool(best_score < self.threshold), end_sample, float(best_score)
+
+def evaluate(detector, positive_files, negative_files):
+    """
+    Runs the full gate (energy VAD, then the detector on each detected utterance) over WAV fixtures.
+    detection_rate: positives with a detection; false_accept_rate: negatives with one (and per hour
+    of negative audio); cpu_per_audio_s: CPU seconds spent per second of audio, i.e. idle cost.
+    """
+    from vad import Endpointer
+
+    def gate(samples):
+        endpointer = Endpointer(SAMPLE_RATE, keep_audio=True)
+        detected = False
+        start = 0
+        while start < len(samples):
+            if endpointer.process(samples[start:start + HOP * 3]) == Endpointer.DONE:
+                detected = detected or detector.find(endpointer.utterance())[0]
+                endpointer.reset()
+            start += HOP * 3
+        if endpointer.state == Endpointer.SPEECH:
+            detected = detected or detector.find(endpointer.utterance())[0]
+        return detected
+
+    results = {}
+    for label, files in (("positive", positive_files), ("negative", negative_files)):
+        audio_seconds = 0.0
+        hits = 0
+        cpu_start = time.process_time()
+        for path in files:
+            samples = read_wav(path)
+            audio_seconds += len(samples) / SAMPLE_RATE
+            hits += gate(samples)
+        results[label] = {"files": len(files), "hits": hits, "audio_s": audio_seconds,
+                          "cpu_s": time.process_time() - cpu_start}
+
+    pos, neg = results["positive"], results["negative"]
+    total_audio = pos["audio_s"] + neg["audio_s"]
+    return {
+        "detection_rate": pos["hits"] / pos["files"] if pos["files"] else 0.0,
+        "false_accept_rate": neg["hits"] / neg["files"] if neg["files"] else 0.0,
+        "false_accepts_per_hour": neg["hits"] * 3600 / neg["audio_s"] if neg["audio_s"] else 0.0,
+        "cpu_per_audio_s": (pos["cpu_s"] + neg["cpu_s"]) / total_audio if total_audio else 0.0,
+        "idle_cpu_per_audio_s": neg["cpu_s"] / neg["audio_s"] if neg["audio_s"] else 0.0,
+    }
+
+def enroll(templates_dir, phrase, count=3, seconds=2.0):
+    """Records a few examples of the wake phrase with the default microphone"""
+    import sounddevice as sd
+
+    os.makedirs(templates_dir, exist_ok=True)
+    for i in range(count):
+        input(f"Press Enter and say '{phrase}' ({i + 1}/{count})...")
+        recording = sd.rec(int(seconds * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=1, dtype='int16')
+        sd.wait()
+        from vad import trim_silence
+        samples = trim_silence(recording[:, 0], SAMPLE_RATE, keep_ms=30)
+        path = os.path.join(templates_dir, f"example_{int(time.time())}_{i}.wav")
+        write_wav(path, samples if len(samples) else recording[:, 0])
+        print(f"Saved {path}")
+
+if __name__ == "__main__":
+    with open("config.json") as f:
+        config = json.load(f)
+    settings = config.get("wake_word", {})
+    templates_dir = settings.get("templates_dir", "wake_word")
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "enroll":
+        enroll(templates_dir, settings.get("phrase") or config.get("bot_name", "ChatGenie"))
+    elif len(sys.argv) == 4 and sys.argv[1] == "eval":
+        detector = WakeWordDetector.from_dir(templates_dir, settings.get("threshold", 0.35))
+        positives = sorted(glob.glob(os.path.join(sys.argv[2], "*.wav")))
+        negatives = sorted(glob.glob(os.path.join(sys.argv[3], "*.wav")))
+        for key, value in evaluate(detector, positives, negatives).items():
+            print(f"{key}: {value:.4f}")
+    else:
+        print("usage: python wake_word.py enroll | eval POSITIVE_DIR NEGATIVE_DIR")